@@ -0,0 +1,75 @@
+# Finding the True Frequent Itemsets
+#
+# Copyright 2014 Matteo Riondato <matteo@cs.brown.edu> and Fabio Vandin
+# <vandinfa@imada.sdu.dk>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure the startup time of the scripts.
+
+runExperiment.sh launches the scripts many times for each frequency, so the
+time needed to start them (mostly spent importing modules) is paid at each
+invocation. For each script, we measure the time to start a Python interpreter
+and import the script, and the time of the invocations of getDatasetInfo.py
+and epsilon.py made by the experiments on the given dataset. The stats of the
+dataset are computed (and cached) before the measurements.
+"""
+
+import os.path, subprocess, sys, time
+import getDatasetInfo, utils
+
+SCRIPTS = ("compareFIs", "epsilon", "getDatasetInfo", "getTrueFIsBinom",
+           "getTrueFIsHoldout", "getTrueFIsHoldoutVC",
+           "getTrueFIsHoldoutVCBinom", "getTrueFIsVC")
+
+
+def time_command(command, runs):
+    """ Return the average wall-clock time (in seconds) of 'runs' runs of
+    'command'. """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    start = time.perf_counter()
+    for run in range(runs):
+        subprocess.run(command, cwd=directory, check=True,
+                       stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    if len(sys.argv) != 3:
+        utils.error_exit("Usage: {} runs dataset\n".format(
+            os.path.basename(sys.argv[0])))
+    try:
+        runs = int(sys.argv[1])
+    except ValueError:
+        utils.error_exit("{} is not an integer\n".format(sys.argv[1]))
+    dataset = os.path.abspath(sys.argv[2])
+    getDatasetInfo.get_ds_stats(dataset)
+
+    commands = [("python", [sys.executable, "-c", "pass"])]
+    for script in SCRIPTS:
+        commands.append(("import " + script,
+                         [sys.executable, "-c", "import " + script]))
+    commands.append(("getDatasetInfo.py name",
+                     [sys.executable, "getDatasetInfo.py", "name", dataset]))
+    commands.append(("getDatasetInfo.py size",
+                     [sys.executable, "getDatasetInfo.py", "size", dataset]))
+    commands.append(("epsilon.py",
+                     [sys.executable, "epsilon.py", "0", "0.1", dataset]))
+    for (name, command) in commands:
+        print("{}\t{:.1f} ms".format(name, 1000 * time_command(command,
+                                                                runs)))
+
+
+if __name__ == "__main__":
+    main()
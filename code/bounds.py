@@ -0,0 +1,225 @@
+# Finding the True Frequent Itemsets
+#
+# Copyright 2014 Matteo Riondato <matteo@cs.brown.edu> and Fabio Vandin
+# <vandinfa@imada.sdu.dk>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Cheap bounds to the optimal value of a Set-Union Knapsack Problem (see
+sukp.py).
+
+The VC methods only use the floor of the logarithm of an upper bound to the
+optimal value, so the solver can often be avoided altogether. The upper bounds
+are:
+    'sizes': a union of at most c items contains at most C(c, k) sets of
+        size k. If the selected sets must be an antichain, the LYM inequality
+        sum 1 / C(c, |A|) <= 1 holds, and we use its fractional relaxation.
+    'chain cover': an antichain has at most as many sets as a chain cover of
+        the collection (Dilworth), which we compute with a bipartite matching.
+    'lagrangian': relaxing the constraints 'item - set >= 0' with multipliers
+        (starting from 1/|set| for each item of a set) gives the sum of the
+        positive reduced profits of the sets and of the c items with largest
+        weight. The multipliers are improved with a few subgradient steps.
+    'lp': the linear relaxation, solved with HiGHS.
+The lower bound is the value of a greedy solution.
+"""
+
+import math
+import numpy as np
+
+LAGRANGIAN_ITERATIONS = 30
+
+
+def _get_set_items(model):
+    """ Return a pair (offsets, items) such that the items of the set s are
+    items[offsets[s]:offsets[s + 1]]. """
+    order = np.argsort(model.pair_sets, kind="stable")
+    offsets = np.zeros(model.sets_num + 1, dtype=np.int64)
+    np.cumsum(np.bincount(model.pair_sets, minlength=model.sets_num),
+              out=offsets[1:])
+    return (offsets, model.pair_items[order])
+
+
+def _get_fitting(model, capacity):
+    """ Return the boolean mask of the sets with at most 'capacity' items. """
+    sizes = np.bincount(model.pair_sets, minlength=model.sets_num)
+    return sizes <= capacity
+
+
+def get_sizes_bound(model, capacity):
+    """ Return an upper bound to the optimal value using the sizes of the
+    sets. """
+    sizes = np.bincount(model.pair_sets, minlength=model.sets_num)
+    counts = np.bincount(sizes[sizes <= capacity], minlength=capacity + 1)
+    # Visit the sizes by decreasing C(capacity, size).
+    by_binom = sorted(range(capacity + 1),
+                      key=lambda x: abs(2 * x - capacity))
+    if not model.maximal_chains:
+        return sum(min(int(counts[size]), math.comb(capacity, size)) for size
+                   in by_binom)
+    remaining = 1.0
+    bound = 0.0
+    for size in by_binom:
+        if counts[size] == 0:
+            continue
+        binom = math.comb(capacity, size)
+        taken = min(int(counts[size]), remaining * binom)
+        bound += taken
+        remaining -= taken / binom
+        if remaining <= 0.0:
+            break
+    return int(math.floor(bound + 1e-9))
+
+
+def get_chain_cover_bound(model, capacity):
+    """ Return the size of a minimum chain cover of the sets with at most
+    'capacity' items, which is an upper bound to the size of an antichain. """
+    import scipy.sparse, scipy.sparse.csgraph
+    fitting = _get_fitting(model, capacity)
+    # All the comparable pairs appear in some maximal chain.
+    firsts = []
+    seconds = []
+    for chain_index in range(model.chains_num):
+        chain = model.chain_sets[model.chain_offsets[chain_index]:
+                                 model.chain_offsets[chain_index + 1]]
+        chain = chain[fitting[chain]]
+        for position in range(len(chain) - 1):
+            firsts.append(np.full(len(chain) - position - 1, chain[position]))
+            seconds.append(chain[position + 1:])
+    fitting_num = int(np.count_nonzero(fitting))
+    if len(firsts) == 0:
+        return fitting_num
+    firsts = np.concatenate(firsts)
+    seconds = np.concatenate(seconds)
+    graph = scipy.sparse.csr_matrix(
+        (np.ones(len(firsts), dtype=np.int8), (firsts, seconds)),
+        shape=(model.sets_num, model.sets_num))
+    graph.sum_duplicates()
+    matching = scipy.sparse.csgraph.maximum_bipartite_matching(
+        graph, perm_type="column")
+    return fitting_num - int(np.count_nonzero(matching[fitting] > -1))
+
+
+def get_lagrangian_bound(model, capacity, target=0):
+    """ Return the Lagrangian upper bound to the optimal value, improved with
+    subgradient steps towards the lower bound 'target'. """
+    fitting = _get_fitting(model, capacity)
+    pairs = fitting[model.pair_sets]
+    pair_sets = model.pair_sets[pairs]
+    pair_items = model.pair_items[pairs]
+    if len(pair_sets) == 0:
+        return 0
+    sizes = np.bincount(pair_sets, minlength=model.sets_num)
+    multipliers = 1.0 / sizes[pair_sets]
+    best_bound = math.inf
+    for iteration in range(LAGRANGIAN_ITERATIONS):
+        profits = 1.0 - np.bincount(pair_sets, weights=multipliers,
+                                    minlength=model.sets_num)
+        profits[~fitting] = 0.0
+        weights = np.bincount(pair_items, weights=multipliers,
+                              minlength=model.items_num)
+        top_items = np.argsort(-weights, kind="stable")[:capacity]
+        top_items = top_items[weights[top_items] > 0]
+        bound = np.sum(profits[profits > 0]) + np.sum(weights[top_items])
+        best_bound = min(best_bound, bound)
+        if best_bound < target + 1.0:
+            break
+        # Subgradient: y_i - x_s for each pair.
+        selected_sets = profits > 0
+        selected_items = np.zeros(model.items_num, dtype=bool)
+        selected_items[top_items] = True
+        subgradient = selected_items[pair_items].astype(float) - \
+            selected_sets[pair_sets]
+        norm = np.dot(subgradient, subgradient)
+        if norm == 0:
+            break
+        step = (bound - target) / norm
+        multipliers = np.maximum(0.0, multipliers - step * subgradient)
+    return int(math.floor(best_bound + 1e-6))
+
+
+def get_lp_bound(model, capacity):
+    """ Return the value of the linear relaxation, rounded down. """
+    import scipy.optimize, scipy.sparse
+    (rows, cols, vals) = model.get_constraints()
+    matrix = scipy.sparse.csr_matrix(
+        (vals, (rows, cols)),
+        shape=(model.pairs_num + 1 + model.chains_num, model.vars_num))
+    upper = np.concatenate((np.zeros(model.pairs_num), [capacity],
+                            np.ones(model.chains_num)))
+    # The pair constraints are 'set - item <= 0' in the form of linprog.
+    matrix = scipy.sparse.diags(np.concatenate(
+        (np.full(model.pairs_num, -1.0),
+         np.ones(1 + model.chains_num)))) @ matrix
+    objective = np.concatenate((np.full(model.sets_num, -1.0),
+                                np.zeros(model.items_num)))
+    result = scipy.optimize.linprog(objective, A_ub=matrix, b_ub=upper,
+                                    bounds=(0, 1), method="highs")
+    if result.status != 0:
+        return model.sets_num
+    return int(math.floor(-result.fun + 1e-6))
+
+
+def get_greedy_solution(model, capacity):
+    """ Return the indexes of the sets of a feasible solution, built by
+    adding the smallest sets first. """
+    (offsets, items) = _get_set_items(model)
+    sizes = np.diff(offsets)
+    # The chains containing each set.
+    chain_ids = np.repeat(np.arange(model.chains_num),
+                          np.diff(model.chain_offsets))
+    chain_order = np.argsort(model.chain_sets, kind="stable")
+    set_chains_offsets = np.zeros(model.sets_num + 1, dtype=np.int64)
+    np.cumsum(np.bincount(model.chain_sets, minlength=model.sets_num),
+              out=set_chains_offsets[1:])
+    set_chains = chain_ids[chain_order]
+
+    used_items = set()
+    used_chains = np.zeros(model.chains_num, dtype=bool)
+    solution = []
+    for set_index in np.argsort(sizes, kind="stable"):
+        if sizes[set_index] > capacity:
+            break
+        chains = set_chains[set_chains_offsets[set_index]:
+                            set_chains_offsets[set_index + 1]]
+        if np.any(used_chains[chains]):
+            continue
+        new_items = set(items[offsets[set_index]:
+                              offsets[set_index + 1]].tolist()) - used_items
+        if len(used_items) + len(new_items) > capacity:
+            continue
+        used_items |= new_items
+        used_chains[chains] = True
+        solution.append(set_index)
+    return np.array(solution, dtype=np.int64)
+
+
+def get_bounds(model, capacity, use_lp=True):
+    """ Return a triple (lower, upper, solution) with a lower and an upper
+    bound to the optimal value of the model with the given capacity, and the
+    indexes of the sets of a feasible solution with value 'lower'.
+
+    The linear relaxation is only solved if 'use_lp' is True and the other
+    upper bounds are larger than the lower bound."""
+    solution = get_greedy_solution(model, capacity)
+    lower = len(solution)
+    upper = min(int(np.count_nonzero(_get_fitting(model, capacity))),
+                get_sizes_bound(model, capacity))
+    if model.maximal_chains and upper > lower:
+        upper = min(upper, get_chain_cover_bound(model, capacity))
+    if upper > lower:
+        upper = min(upper, get_lagrangian_bound(model, capacity, lower))
+    if use_lp and upper > lower:
+        upper = min(upper, get_lp_bound(model, capacity))
+    return (lower, max(lower, upper), solution)
@@ -0,0 +1,118 @@
+# Finding the True Frequent Itemsets
+#
+# Copyright 2014 Matteo Riondato <matteo@cs.brown.edu> and Fabio Vandin
+# <vandinfa@imada.sdu.dk>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Maximal chains of a collection of itemsets ordered by inclusion.
+
+The chain constraints of the optimization problem solved by the VC method are
+the maximal cliques of the comparability graph of the collection, which are
+exactly the maximal chains of the collection. We compute them directly from the
+Hasse diagram of the collection (an itemset is connected to its covers, i.e.,
+the minimal itemsets in the collection that strictly contain it), without
+creating the comparability graph: every maximal chain is a path in the Hasse
+diagram from a minimal itemset to a maximal one.
+
+The Hasse diagram is computed using, for each item, a bitmap (an int) of the
+itemsets containing it: the supersets of an itemset are the AND of the bitmaps
+of its items. The bitmaps of the supersets are computed when needed and not
+kept, so the memory used is linear in the number of itemsets times the number
+of items, and not quadratic in the number of itemsets.
+"""
+
+
+def _iter_bits(bitmap):
+    """ Yield the positions of the bits set in 'bitmap', from the lowest. """
+    while bitmap:
+        lowest = bitmap & -bitmap
+        yield lowest.bit_length() - 1
+        bitmap ^= lowest
+
+
+def get_covers(itemsets):
+    """ Compute the Hasse diagram of the list 'itemsets' (of frozensets).
+
+    Return a pair (covers, has_subsets): covers[i] is the list of the indexes
+    of the covers of itemsets[i], has_subsets[i] is True if itemsets[i]
+    strictly contains some other itemset in the list. The itemsets must be
+    distinct."""
+    itemsets_num = len(itemsets)
+    # Positions ordered by increasing length, and a bitmap for each item of
+    # the positions of the itemsets that contain it.
+    order = sorted(range(itemsets_num), key=lambda x: len(itemsets[x]))
+    rank = [0] * itemsets_num
+    for (position, index) in enumerate(order):
+        rank[index] = position
+    all_bitmap = (1 << itemsets_num) - 1
+    item_bitmaps = dict()
+    for index in range(itemsets_num):
+        bit = 1 << rank[index]
+        for item in itemsets[index]:
+            item_bitmaps[item] = item_bitmaps.get(item, 0) | bit
+
+    def get_strict_supersets(position):
+        """ Return the bitmap of the positions of the strict supersets of the
+        itemset at 'position'. Since the positions are ordered by length, all
+        the strict supersets have a higher position. """
+        bitmap = all_bitmap
+        for item in itemsets[order[position]]:
+            bitmap &= item_bitmaps[item]
+        return bitmap >> (position + 1) << (position + 1)
+
+    covers = [[] for x in range(itemsets_num)]
+    has_subsets = [False] * itemsets_num
+    for index in range(itemsets_num):
+        # A superset is a cover if it does not contain another superset.
+        # Visiting the supersets by increasing length, the supersets of a
+        # cover are not covers.
+        not_covers = 0
+        for position in _iter_bits(get_strict_supersets(rank[index])):
+            if not_covers >> position & 1:
+                continue
+            covers[index].append(order[position])
+            has_subsets[order[position]] = True
+            not_covers |= get_strict_supersets(position)
+    return (covers, has_subsets)
+
+
+def iter_maximal_chains(itemsets):
+    """ Yield the maximal chains of the list 'itemsets' (of frozensets)
+    ordered by inclusion, as lists of indexes of the itemsets, from the
+    smallest itemset to the largest.
+
+    Chains of length one (itemsets that are not comparable with any other
+    itemset) are not returned."""
+    (covers, has_subsets) = get_covers(itemsets)
+    for start in range(len(itemsets)):
+        if has_subsets[start] or len(covers[start]) == 0:
+            continue
+        # Depth-first visit of the paths starting at 'start'. The stack
+        # contains, for each element of the current chain, the iterator over
+        # the covers still to visit.
+        chain = [start, ]
+        stack = [iter(covers[start]), ]
+        while stack:
+            following = next(stack[-1], None)
+            if following is None:
+                stack.pop()
+                chain.pop()
+                continue
+            chain.append(following)
+            if len(covers[following]) == 0:
+                yield list(chain)
+                chain.pop()
+            else:
+                stack.append(iter(covers[following]))
@@ -16,14 +16,16 @@
 # limitations under the License.
 
 import os.path, sys
-import utils
+import itemsets, utils
 
 
 def compare(orig_res, other_res, epsilon=1.0):
     """Compare two sets of FIs and return statistics about them.
 
     'orig_res' and 'other_res' are dict whose keys are itemsets (frozensets)
-    and values are frequencies, like those returned by utils.create_results().
+    and values are frequencies, like those returned by utils.create_results(),
+    or ItemsetStores (see itemsets.py). The smallest of the two is iterated
+    over, and its itemsets are looked up in the other one.
     
     Returns a dict with the following keys (and meanings):
         intersection: size of the intersection
@@ -38,21 +40,34 @@ def compare(orig_res, other_res, epsilon=1.0):
         frequency is greater than epsilon 
     """
     stats = dict()
-    orig_res_set = set(orig_res.keys())
-    other_res_set = set(other_res.keys())
-
-    intersection = orig_res_set & other_res_set
+    intersection = []
+    stats['false_positives_set'] = set()
+    if len(other_res) <= len(orig_res):
+        for itemset in other_res:
+            if itemset in orig_res:
+                intersection.append(itemset)
+            else:
+                stats['false_positives_set'].add(itemset)
+    else:
+        intersection = [itemset for itemset in orig_res if itemset in
+                        other_res]
+        # The false positives are only searched for if there are any.
+        if len(intersection) < len(other_res):
+            intersection_set = set(intersection)
+            stats['false_positives_set'] = set(
+                itemset for itemset in other_res if itemset not in
+                intersection_set)
     stats['intersection'] = len(intersection)
 
-    stats['false_negatives'] = len(orig_res_set - other_res_set)
+    stats['false_negatives'] = len(orig_res) - len(intersection)
 
-    stats['false_positives_set'] = other_res_set - orig_res_set
     stats['false_positives'] = len(stats['false_positives_set'])
     if stats['false_positives'] > 0:
         for itemset in stats['false_positives_set']:
             sys.stderr.write("WARNING! FALSE POSITIVE: '{}', freq={}\n".format(" ".join(str(item) for item in itemset), other_res[itemset]))
 
-    stats['jaccard'] = len(intersection) / len(orig_res_set | other_res_set) 
+    stats['jaccard'] = len(intersection) / (len(orig_res) + len(other_res) -
+        len(intersection))
 
     stats['max_absolute_error'] = 0.0
     absolute_error_sum = 0.0
@@ -95,7 +110,9 @@ def main():
     except ValueError:
         utils.error_exit("{} is not a number\n".format(sys.argv[2]))
 
-    origFIs = utils.create_results(orig_res_filename, min_freq)
+    # The original results are usually much larger than the sample ones, so
+    # we keep them in a compact store.
+    origFIs = itemsets.create_store(orig_res_filename, min_freq)
     sampleFIs = utils.create_results(sample_res_filename, min_freq)
 
     stats = compare(origFIs, sampleFIs, epsilon)
@@ -15,60 +15,136 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import itertools, os, random, sys
-from timeit import Timer
-import getDatasetInfo, utils
-
-sample_size = 0
-population_size = 0
-dataset = ""
-
-
-def create_sample():
-    # Compute indexes of sample lines
-    _random, _int = random.random, int  # speed hack XXX really?
-    sample_lines = sorted([_int(_random() * population_size) for i in itertools.repeat(None, sample_size)])
-
-    index_sample = 0
-    index_lines = 0
-    with open(dataset, "rt") as largeFILE:
-        while index_sample < sample_size:
-            while index_lines < sample_lines[index_sample]:
-                line = largeFILE.readline()
-                index_lines = index_lines + 1
-            line = largeFILE.readline()
-            index_lines = index_lines + 1
-            index_sample = index_sample + 1
-            sys.stdout.write(line)
-
-            # Handle the case when a line is sampled multiple times.
-            while index_sample < sample_size and sample_lines[index_sample] == sample_lines[index_sample - 1]:
-                sys.stdout.write(line)
-                index_sample = index_sample + 1
+"""
+Create a sample of a dataset, with replacement.
+
+The sample contains sample_size transactions of the dataset, chosen
+independently and uniformly at random, and is written to the standard output,
+in the order in which the transactions appear in the dataset.
+
+If the dataset has a valid line-offset index (see lineindex.py), the sampled
+transactions are read directly, with one seek for each of them. Otherwise, the
+dataset is read once, and its size does not need to be known in advance: the
+sample is a set of sample_size independent reservoirs of one transaction each.
+The dataset is read in blocks of complete lines. If a reservoir holds one of
+the first n lines, uniformly at random, and the next block has L lines, then
+replacing the content of the reservoir, with probability L / (n + L), with a
+line of the block chosen uniformly at random, gives a line chosen uniformly at
+random among the first n + L. The number of reservoirs to replace in each
+block is binomial, so the work besides reading the dataset is proportional to
+the number of replacements, i.e., O(sample_size log(blocks)) in expectation.
+"""
+
+import os, sys, time
+import numpy as np
+import getDatasetInfo, lineindex, utils
+
+# Size of the blocks written to the output
+BLOCK_SIZE = 1 << 20
+
+
+def sample_one_pass(dataset, sample_size, rand):
+    """ Return a list of pairs (index, line), for the lines (bytes) of
+    'dataset' in a sample with replacement of size sample_size, using one
+    pass over the dataset and the numpy random Generator 'rand'. The indexes
+    start from 0. """
+    sample = [None] * sample_size
+    lines_num = 0
+    for block in getDatasetInfo.iter_blocks(dataset):
+        buf = np.frombuffer(block, dtype=np.uint8)
+        ends = np.flatnonzero(buf == 10) + 1
+        if block[-1:] != b"\n":
+            ends = np.concatenate((ends, [len(block)]))
+        block_lines = len(ends)
+        lines_num += block_lines
+        replaced_num = rand.binomial(sample_size, block_lines / lines_num)
+        slots = rand.choice(sample_size, replaced_num, replace=False)
+        chosen = rand.integers(0, block_lines, replaced_num)
+        for (slot, line) in zip(slots.tolist(), chosen.tolist()):
+            start = int(ends[line - 1]) if line > 0 else 0
+            sample[slot] = (lines_num - block_lines + line,
+                            block[start:int(ends[line])])
+    if lines_num == 0 and sample_size > 0:
+        utils.error_exit("{} is empty\n".format(dataset))
+    return sorted(sample)
+
+
+def sample_indexed(dataset, offsets, sample_size, rand):
+    """ Return a list of pairs (index, line), for the lines (bytes) of
+    'dataset' in a sample with replacement of size sample_size, reading only
+    the sampled lines using their offsets (see lineindex.py) and the numpy
+    random Generator 'rand'. The indexes start from 0. """
+    lines_num = len(offsets) - 1
+    if lines_num == 0 and sample_size > 0:
+        utils.error_exit("{} is empty\n".format(dataset))
+    sample = []
+    with open(dataset, "rb") as DS:
+        for index in np.sort(rand.integers(0, lines_num,
+                                           sample_size)).tolist():
+            if len(sample) > 0 and sample[-1][0] == index:
+                sample.append(sample[-1])
+                continue
+            DS.seek(int(offsets[index]))
+            line = DS.read(int(offsets[index + 1] - offsets[index]))
+            sample.append((index, line))
+    return sample
+
+
+def write_sample(sample, OUT):
+    """ Write the lines of the sample to the binary file OUT, in blocks. The
+    last line of the dataset may have no newline, so one is added. """
+    buffer = []
+    buffer_size = 0
+    for (index, line) in sample:
+        if not line.endswith(b"\n"):
+            line += b"\n"
+        buffer.append(line)
+        buffer_size += len(line)
+        if buffer_size >= BLOCK_SIZE:
+            OUT.write(b"".join(buffer))
+            buffer = []
+            buffer_size = 0
+    OUT.write(b"".join(buffer))
+    OUT.flush()
+
+
+def create_sample(dataset, sample_size, OUT, rand=None):
+    """ Write a sample with replacement of size sample_size of 'dataset' to
+    the binary file OUT, using the numpy random Generator 'rand' (by default,
+    a new one with a random seed). """
+    if rand is None:
+        rand = np.random.default_rng()
+    offsets = lineindex.load(dataset)
+    if offsets is not None:
+        sample = sample_indexed(dataset, offsets, sample_size, rand)
+    else:
+        sample = sample_one_pass(dataset, sample_size, rand)
+    write_sample(sample, OUT)
 
 
 def main():
-    global sample_size 
-    global population_size
-    global dataset
     # Verify arguments
-    if len(sys.argv) != 3: 
-        utils.error_exit("Usage: {} samplesize dataset\n".format(os.path.basename(sys.argv[0])))
+    if len(sys.argv) != 3 and len(sys.argv) != 4:
+        utils.error_exit("Usage: {} samplesize dataset [seed]\n".format(os.path.basename(sys.argv[0])))
     dataset = sys.argv[2]
+    if not os.path.isfile(dataset):
+        utils.error_exit("{} does not exist, or is not a file\n".format(dataset))
     try:
         sample_size = int(sys.argv[1])
     except ValueError:
         utils.error_exit("{} is not a number\n".format(sys.argv[1]))
+    seed = None
+    if len(sys.argv) == 4:
+        try:
+            seed = int(sys.argv[3])
+        except ValueError:
+            utils.error_exit("{} is not a number\n".format(sys.argv[3]))
 
-    ds_stats = getDatasetInfo.get_stats(dataset)
-    population_size = ds_stats['size']
-
-    random.seed()
-
-    t = Timer("create_sample()", "from __main__ import create_sample")
-    sys.stderr.write("Creating the sample took: {} ms \n".format(t.timeit(1) * 1000))
+    start = time.perf_counter()
+    create_sample(dataset, sample_size, sys.stdout.buffer,
+                  np.random.default_rng(seed))
+    sys.stderr.write("Creating the sample took: {} ms \n".format((time.perf_counter() - start) * 1000))
 
 
 if __name__ == "__main__":
     main()
-
@@ -15,8 +15,31 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import math, sys
-import getDatasetInfo, utils
+"""
+Epsilons of the first step of the VC methods.
+
+The epsilon computed from the stats of a dataset (see epsilon_dataset()) only
+depends on delta and on whether additional knowledge is used, so it is the
+same for all the frequencies of an experiment. The epsilons of a dataset are
+computed in bulk, for a grid of values of delta (DELTAS, the values lowered as
+done by the methods, and the requested ones) and for both values of
+use_additional_knowledge, with numpy (see epsilons_grid()), and stored in the
+stats cache (see statscache.py), so that the scripts and the sweeps look them
+up. The table is stored with the parameters of the dataset it was computed
+from (see get_ds_params()), and it is computed again if the stats of the
+dataset change (e.g., if they are computed again by a new version of
+getDatasetInfo.py). The epsilons of datasets in datasetsinfo.py, which are not
+files, are computed but not stored.
+"""
+
+import math, os.path, sys
+import getDatasetInfo, statscache, utils
+
+# Values of delta for which the epsilons are computed with the requested ones
+DELTAS = (0.1, 0.05, 0.01, 0.005, 0.001)
+# Kind and version of the epsilons in the stats cache
+CACHE_NAME = "epsilons"
+CACHE_VERSION = 2
 
 
 def get_eps_vc_dim(delta, ds_size, vc_dim, c=0.5):
@@ -56,48 +79,140 @@ def epsilons(delta, ds_size, vc_dim, emp_vc_dim, max_freq=1.0):
     return (eps_vc_dim, eps_shatter, returned)
 
 
-def epsilon_dataset(delta, ds_stats, use_additional_knowledge=False,
-        max_freq=1.0):
-    """ Call epsilons() filling in the appropriate values for the parameters
-    depending whether to use additional knowledge or not. See below for type
-    descriptions.
-    """
-
+def get_ds_params(ds_stats, use_additional_knowledge=False):
+    """ Return the tuple (ds_size, vc_dim, emp_vc_dim, max_freq) of the
+    parameters of epsilons() for the dataset with stats ds_stats. """
     if not use_additional_knowledge:
         # make no assumption on the generative process. VC-dimension is number
         # of items - 1.
-        (eps_vc_dim, eps_shatter, returned) = epsilons(delta,
-                ds_stats['size'], ds_stats['numitems'] -1,
-                ds_stats['dindex'], ds_stats['maxsupp'] /
-                ds_stats['size'])
+        vc_dim = ds_stats['numitems'] - 1
     else:
         # incorporate available information about the unknown probability
         # distribution, more precisely assuming that it cannot generate
         # transactions longer than twice the longest transactions available in
         # the dataset (using this quantity as bound to the VC-dimension).
-        (eps_vc_dim, eps_shatter, returned) = epsilons(delta,
-                ds_stats['size'], min(2 * (ds_stats['maxlen']) -1,
-                ds_stats['numitems'] -1), ds_stats['dindex'],
-                ds_stats['maxsupp'] / ds_stats['size'])
+        vc_dim = min(2 * (ds_stats['maxlen']) - 1, ds_stats['numitems'] - 1)
+    return (ds_stats['size'], vc_dim, ds_stats['dindex'],
+            ds_stats['maxsupp'] / ds_stats['size'])
+
 
+def epsilon_dataset(delta, ds_stats, use_additional_knowledge=False,
+        max_freq=1.0):
+    """ Call epsilons() filling in the appropriate values for the parameters
+    depending whether to use additional knowledge or not. See below for type
+    descriptions.
+    """
+    return epsilons(delta, *get_ds_params(ds_stats, use_additional_knowledge))
+
+
+def epsilons_grid(deltas, ds_sizes, vc_dims, emp_vc_dims, max_freqs, c=0.5):
+    """ Return a pair of numpy arrays with the epsilons using the
+    VC-dimension and the epsilons using a bound to the shatter coefficient
+    (see epsilons()), for all the combinations of the parameters.
+
+    The parameters are numbers or numpy arrays, broadcast against each other
+    as usual in numpy, e.g., deltas[:, None] and ds_sizes[None, :] give the
+    epsilons for all the pairs (delta, ds_size)."""
+    import numpy as np
+    deltas = np.asarray(deltas, dtype=np.float64)
+    ds_sizes = np.asarray(ds_sizes, dtype=np.float64)
+    vc_dims = np.asarray(vc_dims, dtype=np.float64)
+    emp_vc_dims = np.asarray(emp_vc_dims, dtype=np.float64)
+    max_freqs = np.asarray(max_freqs, dtype=np.float64)
+    eps_vc_dim = np.sqrt((c / ds_sizes) * (vc_dims + np.log(1 / deltas)))
+    bound = np.minimum((vc_dims + 1) * math.log(2), emp_vc_dims *
+                       np.log(math.e * ds_sizes / emp_vc_dims))
+    eps_shatter = 2 * np.sqrt(max_freqs * 2 * bound / ds_sizes) + \
+        np.sqrt((2 * np.log(4 / deltas)) / ds_sizes)
+    return np.broadcast_arrays(eps_vc_dim, eps_shatter)
+
+
+def get_lower_delta(delta):
+    """ Return the delta used for each of the two steps of the methods with
+    confidence parameter delta, so that they both succeed with probability at
+    least 1 - delta. """
+    return 1.0 - math.sqrt(1 - delta)
+
+
+def epsilon_table(ds_stats, deltas):
+    """ Return a dict mapping the pairs (use_additional_knowledge, delta), for
+    use_additional_knowledge in (0, 1) and delta in 'deltas', to the pairs
+    (eps_vc_dim, eps_shatter) computed by epsilon_dataset(). """
+    import numpy as np
+    deltas = sorted(set(deltas))
+    params = np.array([get_ds_params(ds_stats, x) for x in (0, 1)])
+    (eps_vc_dim, eps_shatter) = epsilons_grid(
+        np.array(deltas)[None, :], *[params[:, [x]] for x in range(4)])
+    return {(knowl, delta): (float(eps_vc_dim[knowl, i]),
+                             float(eps_shatter[knowl, i]))
+            for knowl in (0, 1) for (i, delta) in enumerate(deltas)}
+
+
+def get_epsilons(delta, dataset, use_additional_knowledge=False,
+                 ds_stats=None):
+    """ Return the same tuple as epsilon_dataset() for the dataset 'dataset'
+    (with stats ds_stats, by default computed by getDatasetInfo), from the
+    table of its epsilons in the stats cache.
+
+    The cached table is a dict with keys 'params' (the parameters of the
+    dataset for both values of use_additional_knowledge, see
+    get_ds_params()) and 'epsilons' (the dict returned by epsilon_table()).
+    If delta is not in the table, or the parameters of the dataset are not
+    the ones of the table, the table is computed again, for delta and for the
+    values of delta in the table and in DELTAS (both as they are and lowered
+    with get_lower_delta()), and stored."""
+    use_additional_knowledge = int(bool(use_additional_knowledge))
+    if ds_stats is None:
+        ds_stats = getDatasetInfo.get_ds_stats(dataset)
+    params = tuple(get_ds_params(ds_stats, x) for x in (0, 1))
+    is_file = os.path.isfile(dataset)
+    cached = statscache.lookup(dataset, CACHE_NAME, CACHE_VERSION) if \
+        is_file else None
+    if cached is None:
+        cached = {'params': params, 'epsilons': dict()}
+    table = cached['epsilons']
+    if cached['params'] != params or \
+            (use_additional_knowledge, delta) not in table:
+        deltas = set(x[1] for x in table) | set(DELTAS) | \
+            set(get_lower_delta(x) for x in DELTAS) | set((delta, ))
+        table = epsilon_table(ds_stats, deltas)
+        if is_file:
+            statscache.store(dataset, {'params': params, 'epsilons': table},
+                             CACHE_NAME, CACHE_VERSION)
+    (eps_vc_dim, eps_shatter) = table[(use_additional_knowledge, delta)]
+    if eps_vc_dim < eps_shatter:
+        returned = "vc_dim"
+    elif eps_vc_dim > eps_shatter:
+        returned = "shatter"
+    else:
+        returned = "equal"
     return (eps_vc_dim, eps_shatter, returned)
 
 
 def main():
-    if len(sys.argv) != 4:
-        utils.error_exit("Usage: {} use_additional_knowledge={{0|1}} delta dataset\n".format(sys.argv[0]))
+    usage = "Usage: {} [-l] use_additional_knowledge={{0|1}} delta dataset\n".format(sys.argv[0])
+    args = sys.argv[1:]
+    # With -l, use the delta of each step of the methods (see
+    # get_lower_delta()).
+    lower = len(args) > 0 and args[0] == "-l"
+    if lower:
+        args = args[1:]
+    if len(args) != 3:
+        utils.error_exit(usage)
     try:
-        use_additional_knowledge = int(sys.argv[1])
+        use_additional_knowledge = int(args[0])
     except ValueError:
-        utils.error_exit("{} is not an integer\n".format(sys.argv[1]))
+        utils.error_exit("{} is not an integer\n".format(args[0]))
     try:
-        delta = float(sys.argv[2])
+        delta = float(args[1])
     except ValueError:
-        utils.error_exit("{} is not an integer\n".format(sys.argv[2]))
-
-    ds_stats = getDatasetInfo.get_ds_stats(sys.argv[3])
+        utils.error_exit("{} is not a number\n".format(args[1]))
+    if delta <= 0 or delta >= 1:
+        utils.error_exit("delta must be in (0, 1)\n")
+    if lower:
+        delta = get_lower_delta(delta)
 
-    (eps_vc_dim, eps_emp_vc_dim, returned) = epsilon_dataset(delta, ds_stats, use_additional_knowledge)
+    (eps_vc_dim, eps_emp_vc_dim, returned) = get_epsilons(delta, args[2], use_additional_knowledge)
 
     print("{} {}".format(eps_vc_dim, eps_emp_vc_dim))
     print("{}\t{}".format(min(eps_vc_dim, eps_emp_vc_dim), returned))
@@ -15,11 +15,324 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import os.path, sys
-import datasetsinfo, utils
+import bisect, os, os.path, sys
+import statscache, utils
+# numpy, multiprocessing, lineindex, and datasetsinfo are imported by the
+# functions that use them: the scripts that only need the name or the (cached)
+# stats of a dataset do not pay for their import.
 
+# Version of the stats computed by compute_ds_stats() in the stats cache (see
+# statscache.py). Increase it whenever the stats computed for a dataset change.
+STATS_VERSION = 2
+# Size of the blocks read from the dataset
+BLOCK_SIZE = 1 << 24
+# Datasets smaller than this are scanned by a single process
+MIN_PARALLEL_SIZE = 4 * BLOCK_SIZE
+# Largest item for which item supports are computed with bincount
+MAX_BINCOUNT_ITEM = 1 << 26
+# Bytes that separate the items
+WHITESPACE = (9, 10, 11, 12, 13, 32)
 
-def compute_ds_stats(dataset):
+
+class DIndexBound:
+    """ Maintain the upper bound to the d-index of a sequence of transactions.
+
+    We keep a list T of transactions, sorted by decreasing length, such that
+    T[i] has length greater than i, and no transaction added to T is a subset
+    of another transaction in T. The bound is the length of T. A transaction
+    is only considered if it is longer than the current bound, and it is only
+    compared with the transactions in T at least as long as itself."""
+
+    def __init__(self):
+        self.transactions = []
+        self.neg_lengths = []
+        self.d_index = 0
+
+    def add(self, transaction):
+        """ Consider the transaction (a frozenset) for T. """
+        length = len(transaction)
+        if length <= self.d_index:
+            return
+        # Only the transactions at least as long can contain this one.
+        longer_equal = bisect.bisect_right(self.neg_lengths, -length)
+        for index in range(longer_equal):
+            if transaction <= self.transactions[index]:
+                return
+        self.transactions.insert(longer_equal, transaction)
+        self.neg_lengths.insert(longer_equal, -length)
+        d_index = 0
+        for neg_length in self.neg_lengths:
+            if -neg_length <= d_index:
+                break
+            d_index += 1
+        self.d_index = d_index
+        del self.transactions[d_index:]
+        del self.neg_lengths[d_index:]
+
+
+def parse_block(block):
+    """ Parse a block (bytes) of complete lines of a dataset.
+
+    Return a pair (line_offsets, items) of numpy arrays such that the items of
+    the i-th transaction in the block are items[line_offsets[i]:
+    line_offsets[i+1]]. The items of a transaction are sorted and repeated
+    items are removed. A last line without a newline is a transaction."""
+    import numpy as np
+    whitespace_table = np.zeros(256, dtype=bool)
+    whitespace_table[list(WHITESPACE)] = True
+    buf = np.frombuffer(block, dtype=np.uint8)
+    whitespace = whitespace_table[buf]
+    token_starts = np.flatnonzero(~whitespace & np.concatenate(
+        ([True], whitespace[:-1])))
+    newlines = np.flatnonzero(buf == 10)
+    lines_num = len(newlines)
+    if len(buf) > 0 and buf[-1] != 10:
+        lines_num += 1
+    if len(token_starts) > 0:
+        items = np.fromstring(block, dtype=np.int64, sep=' ')
+    else:
+        items = np.zeros(0, dtype=np.int64)
+    if len(items) != len(token_starts):
+        utils.error_exit("Malformed transaction in the dataset\n")
+    token_lines = np.searchsorted(newlines, token_starts)
+    line_offsets = np.zeros(lines_num + 1, dtype=np.int64)
+    np.cumsum(np.bincount(token_lines, minlength=lines_num),
+              out=line_offsets[1:])
+    # Items are usually sorted in each transaction: only sort and remove
+    # duplicates if they are not.
+    same_line = token_lines[1:] == token_lines[:-1]
+    if np.any(items[1:][same_line] <= items[:-1][same_line]):
+        order = np.lexsort((items, token_lines))
+        items = items[order]
+        token_lines = token_lines[order]
+        keep = np.concatenate(([True], (items[1:] != items[:-1]) |
+                               (token_lines[1:] != token_lines[:-1])))
+        items = items[keep]
+        token_lines = token_lines[keep]
+        np.cumsum(np.bincount(token_lines, minlength=lines_num),
+                  out=line_offsets[1:])
+    return (line_offsets, items)
+
+
+def iter_blocks(dataset, start=0, end=None):
+    """ Yield blocks (bytes) of complete lines of 'dataset' in the byte range
+    [start, end), which must start and end at line boundaries. """
+    if end is None:
+        end = os.path.getsize(dataset)
+    with open(dataset, 'rb') as DS:
+        DS.seek(start)
+        position = start
+        remainder = b""
+        while position < end:
+            block = DS.read(min(BLOCK_SIZE, end - position))
+            if len(block) == 0:
+                break
+            position += len(block)
+            if position < end:
+                last_newline = block.rfind(b"\n")
+                if last_newline == -1:
+                    remainder += block
+                    continue
+                (block, remainder) = (remainder + block[:last_newline + 1],
+                                      block[last_newline + 1:])
+            else:
+                (block, remainder) = (remainder + block, b"")
+            yield block
+        if len(remainder) > 0:
+            yield remainder
+
+
+def scan(dataset, start=0, end=None, offsets=False, min_length=None):
+    """ Compute the partial stats of the transactions of 'dataset' in the
+    byte range [start, end), which must start and end at line boundaries.
+
+    Return a dict with keys 'size', 'lengths' (numpy array: the number of
+    transactions of each length), 'items' and 'supports' (numpy arrays: the
+    items and their supports), and 'dindex' (a DIndexBound, or None if
+    min_length is not None). If min_length is not None, the dict also has key
+    'candidates': the list of the transactions (frozensets) longer than
+    min_length, in the order of the file. Use merge_stats() to combine them
+    into the final stats. If 'offsets' is True, the dict also has key
+    'offsets': a list of arrays with the offsets of the lines following the
+    newlines in the range (see lineindex.py)."""
+    import numpy as np
+    import lineindex
+    size = 0
+    lengths = np.zeros(1, dtype=np.int64)
+    item_supports = []
+    dindex = DIndexBound() if min_length is None else None
+    candidates = []
+    offsets_blocks = []
+    position = start
+    for block in iter_blocks(dataset, start, end):
+        if offsets:
+            offsets_blocks.append(lineindex.get_block_offsets(block,
+                                                              position))
+            position += len(block)
+        (line_offsets, items) = parse_block(block)
+        size += len(line_offsets) - 1
+        block_lengths = np.diff(line_offsets)
+        block_lengths_count = np.bincount(block_lengths)
+        if len(block_lengths_count) > len(lengths):
+            block_lengths_count[:len(lengths)] += lengths
+            lengths = block_lengths_count
+        else:
+            lengths[:len(block_lengths_count)] += block_lengths_count
+        item_supports.append(count_items(items))
+        if dindex is None:
+            for line in np.flatnonzero(block_lengths > min_length):
+                candidates.append(frozenset(
+                    items[line_offsets[line]:line_offsets[line + 1]].tolist()))
+            continue
+        # Only the transactions longer than the current bound to the
+        # d-index can change it.
+        for line in np.flatnonzero(block_lengths > dindex.d_index):
+            if block_lengths[line] > dindex.d_index:
+                dindex.add(frozenset(items[line_offsets[line]:
+                                           line_offsets[line + 1]].tolist()))
+    (items, supports) = merge_item_supports(item_supports)
+    partial = {'size': size, 'lengths': lengths, 'items': items, 'supports':
+               supports, 'dindex': dindex}
+    if dindex is None:
+        partial['candidates'] = candidates
+    if offsets:
+        partial['offsets'] = offsets_blocks
+    return partial
+
+
+def count_items(items):
+    """ Return a pair (items, supports) of numpy arrays with the distinct
+    items in the array 'items' and the number of times they appear. """
+    import numpy as np
+    if len(items) > 0 and items.min() >= 0 and \
+            items.max() < MAX_BINCOUNT_ITEM:
+        supports = np.bincount(items)
+        present = np.flatnonzero(supports)
+        return (present, supports[present])
+    return np.unique(items, return_counts=True)
+
+
+def merge_item_supports(item_supports):
+    """ Merge a list of pairs (items, supports) as returned by count_items().
+    """
+    import numpy as np
+    if len(item_supports) == 0:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    if len(item_supports) == 1:
+        return item_supports[0]
+    items = np.concatenate([x[0] for x in item_supports])
+    supports = np.concatenate([x[1] for x in item_supports])
+    (merged_items, inverse) = np.unique(items, return_inverse=True)
+    return (merged_items, np.bincount(inverse, weights=supports,
+                                      minlength=len(merged_items)).astype(
+                                          np.int64))
+
+
+def merge_stats(partials):
+    """ Combine a list of partial stats, as returned by scan() for
+    consecutive ranges of the dataset, into the dict described in
+    compute_ds_stats().
+
+    The first partial must have a DIndexBound, and the following ones the
+    candidates longer than its bound (see scan()). The candidates are added
+    to the DIndexBound in the order of the file. The bound never decreases,
+    and the transactions not longer than the bound are never considered, so
+    the transactions not among the candidates would be ignored by a single
+    scan too: the bound is the one computed by compute_dindex_bound()."""
+    import numpy as np
+    size = 0
+    lengths = np.zeros(1, dtype=np.int64)
+    for partial in partials:
+        size += partial['size']
+        if len(partial['lengths']) > len(lengths):
+            lengths = np.concatenate((lengths, np.zeros(
+                len(partial['lengths']) - len(lengths), dtype=np.int64)))
+        lengths[:len(partial['lengths'])] += partial['lengths']
+    dindex = partials[0]['dindex']
+    for partial in partials[1:]:
+        for transaction in partial['candidates']:
+            dindex.add(transaction)
+    (items, supports) = merge_item_supports(
+        [(x['items'], x['supports']) for x in partials])
+    present_lengths = np.flatnonzero(lengths)
+    return {'size': size, 'dindex': dindex.d_index, 'maxlen':
+            int(present_lengths[-1]) if len(present_lengths) > 0 else 0,
+            'maxsupp': int(supports.max()) if len(supports) > 0 else 0,
+            'numitems': len(items), 'lengths': dict(
+                (int(x), int(lengths[x])) for x in present_lengths),
+            'items': set(items.tolist())}
+
+
+def compute_dindex_bound(dataset):
+    """ Return the upper bound to the d-index of 'dataset', computed by
+    reading the transactions one by one, in the order of the file.
+
+    This is the original (slow) algorithm, which compute_ds_stats() must
+    reproduce (see check_ds_stats())."""
+    T = []
+    d_index = 0
+    with open(dataset, 'rt') as DS:
+        for line in DS:
+            t = frozenset(map(int, line.split()))
+            if len(t) <= d_index:
+                continue
+            process = True
+            for p in T:
+                if t.issubset(p):
+                    process = False
+                    break
+            if not process:
+                continue
+            T.append(t)
+            T.sort(key=len, reverse=True)
+            d_index = 0
+            for p in T:
+                if len(p) <= d_index:
+                    break
+                d_index += 1
+            T = T[:d_index]
+    return d_index
+
+
+def get_chunks(dataset, chunks_num):
+    """ Split 'dataset' in at most chunks_num byte ranges of about the same
+    size, starting and ending at line boundaries.
+
+    The boundaries are taken from the line-offset index of the dataset, if
+    there is a valid one (see lineindex.py). Otherwise, they are found by
+    reading the line around each boundary.
+
+    Return a list of pairs (start, end)."""
+    import lineindex
+    size = os.path.getsize(dataset)
+    offsets = lineindex.load(dataset)
+    if offsets is not None:
+        positions = [chunk * size // chunks_num for chunk in range(1,
+                                                                    chunks_num)]
+        starts = [0, ]
+        for offset in lineindex.get_line_starts(offsets, positions).tolist():
+            if starts[-1] < offset < size:
+                starts.append(offset)
+        return list(zip(starts, starts[1:] + [size, ]))
+    starts = [0, ]
+    with open(dataset, 'rb') as DS:
+        for chunk in range(1, chunks_num):
+            offset = chunk * size // chunks_num
+            if offset <= starts[-1]:
+                continue
+            DS.seek(offset - 1)
+            # Move to the beginning of the next line, unless offset is
+            # already at the beginning of a line.
+            DS.readline()
+            offset = DS.tell()
+            if offset >= size:
+                break
+            if offset > starts[-1]:
+                starts.append(offset)
+    return list(zip(starts, starts[1:] + [size, ]))
+
+
+def compute_ds_stats(dataset, processes=None, build_index=False):
     """Compute various stats about the dataset. 
     
     Returns a dict where the keys are stats names and values are the stats
@@ -36,74 +349,90 @@ def compute_ds_stats(dataset):
     Example:
      {'dindex': 1, 'lengths': {1: 5}, 'items': {1, 2, 3, 4, 5}, 'maxsupp': 4, 'size': 6, 'numitems': 5, 'maxlen': 1}
 
-    """
-    with open(dataset, 'rt') as DS:
-        max_len = 0
-        item_supp = dict()
-        items = set() 
-        T = [frozenset(map(int,DS.readline().split()))]
-        size = 1
-        d_index = 1
-        transaction_lengths = dict()
-        transaction_lengths[len(T[0])] = 1
-        for item in T[0]:
-            item_supp[item] = 1
+    The dataset is read in blocks, which are parsed into numpy arrays. See
+    scan() and merge_stats(). Large datasets are split into chunks that are
+    scanned in parallel by 'processes' processes (by default, the number of
+    CPUs). The first chunk, of about BLOCK_SIZE bytes, is scanned first to
+    compute a bound to the d-index, and the other chunks only keep the
+    transactions longer than it, so that the bound to the d-index of the
+    whole dataset is the one computed by a single process.
 
-        for line in DS:
-            t = frozenset(map(int,line.split()))
-            size += 1
-            line_length = len(t)
-            if line_length in transaction_lengths:
-                transaction_lengths[line_length] += 1
-            else:
-                transaction_lengths[line_length] = 1
-            for item in t:
-                if item in item_supp:
-                    item_supp[item] += 1
-                else:
-                    item_supp[item] = 1
-
-            if len(t) > d_index:
-                process = True
-                for p in T:
-                    if t.issubset(p):
-                        process = False
-                        break
-                if not process:
-                    continue
-                T.append(t)
-                T.sort(key=len, reverse=True)
-                d_index = 0
-                for p in T:
-                    if len(p) <= d_index:
-                        break
-                    d_index += 1
-                T = T[:d_index]
+    If build_index is True, the line-offset index of the dataset (see
+    lineindex.py) is also written, using the offsets found by the scan.
+
+    """
+    import multiprocessing
+    if processes is None:
+        processes = os.cpu_count() or 1
+    size = os.path.getsize(dataset)
+    if processes == 1 or size < MIN_PARALLEL_SIZE:
+        chunks = [(0, size), ]
+    else:
+        chunks = get_chunks(dataset, max(processes, size // BLOCK_SIZE))
+    partials = [scan(dataset, chunks[0][0], chunks[0][1], build_index), ]
+    if len(chunks) > 1:
+        # The other chunks are grouped in (at most) 'processes' consecutive
+        # ranges.
+        per_range = -(-(len(chunks) - 1) // processes)
+        ranges = [(chunks[x][0],
+                   chunks[min(x + per_range, len(chunks)) - 1][1])
+                  for x in range(1, len(chunks), per_range)]
+        min_length = partials[0]['dindex'].d_index
+        with multiprocessing.Pool(len(ranges)) as pool:
+            partials += pool.starmap(scan, [(dataset, start, end, build_index,
+                                             min_length)
+                                            for (start, end) in ranges])
+    if build_index:
+        import lineindex
+        try:
+            lineindex.write(dataset, [offsets for partial in partials for
+                                      offsets in partial['offsets']])
+        except OSError:
+            sys.stderr.write("Cannot write the line-offset index of {}\n".format(dataset))
+    return merge_stats(partials)
 
-            if len(t) > max_len:
-                max_len = len(t)
-            items = items.union(t)
 
-    return {'size': size, 'dindex': d_index, 'maxlen': max_len, 'maxsupp':
-            max(item_supp.values()), 'numitems': len(items), 'lengths':
-            transaction_lengths, 'items': items}
+def check_ds_stats(dataset):
+    """ Check that the bounds to the d-index computed by compute_ds_stats()
+    with a single process and with the default number of processes (at least
+    two) are the one computed by compute_dindex_bound(). Exit with an error
+    otherwise. """
+    d_index = compute_dindex_bound(dataset)
+    sequential = compute_ds_stats(dataset, processes=1)['dindex']
+    parallel = compute_ds_stats(dataset, processes=max(
+        2, os.cpu_count() or 1))['dindex']
+    if sequential != d_index or parallel != d_index:
+        utils.error_exit("Wrong d-index bound of {}: {} (sequential), {} (parallel), {} (expected)\n".format(dataset, sequential, parallel, d_index))
+    print(d_index)
 
 
 def get_ds_stats(dataset, force_compute = False):
     """ Return a dict containing the statistics about the dataset.
     
-    Look up 'dataset' in datasetsinfo.ds_stat. If present, return that dict,
-    otherwise, compute the stats.
+    If 'dataset' is a file, look it up in the stats cache (see statscache.py),
+    and if the stats are not there, compute them and store them in the cache.
+    Otherwise, look up 'dataset' in datasetsinfo.ds_stats, which is only used
+    for the datasets that are not available. If force_compute is True, always
+    compute the stats.
 
     See the comment at the beginning of compute_ds_stats() for info about the
     dict."""
-
+    if os.path.isfile(dataset):
+        if not force_compute:
+            stats = statscache.lookup(dataset, "stats", STATS_VERSION)
+            if stats is not None:
+                return stats
+        import lineindex
+        # Build the line-offset index while scanning, if it is missing.
+        stats = compute_ds_stats(dataset, build_index=lineindex.load(dataset)
+                                 is None)
+        statscache.store(dataset, stats, "stats", STATS_VERSION)
+        return stats
+    # datasetsinfo is large, so it is only imported when the stats are needed.
+    import datasetsinfo
     if dataset in datasetsinfo.ds_stats and force_compute == False:
         return datasetsinfo.ds_stats[dataset]
-    else:
-        if not os.path.isfile(dataset):
-            utils.error_exit("{} not found in datasetsinfo.py and does not exist or is not a file\n".format(dataset))
-        return compute_ds_stats(dataset)
+    utils.error_exit("{} does not exist or is not a file, and is not found in datasetsinfo.py\n".format(dataset))
 
 
 def main():
@@ -112,6 +441,8 @@ def main():
 
     if len(sys.argv) == 3 and sys.argv[1] == "name":
         print(os.path.basename(sys.argv[-1]))
+    elif len(sys.argv) == 3 and sys.argv[1] == "check":
+        check_ds_stats(sys.argv[-1])
     else:
         stats = get_ds_stats(sys.argv[-1])
         if len(sys.argv) == 2:
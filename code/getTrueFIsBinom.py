@@ -16,10 +16,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
 import math
 import os.path
 import sys
 import getDatasetInfo
+import thresholds
 import utils
 
 
@@ -42,8 +44,6 @@ def get_trueFIs(ds_stats, res_filename, min_freq, delta, pvalue_mode,
 
     stats = dict()
 
-    sample_res = utils.create_results(res_filename, min_freq)
-
     # We work in the log-space
     stats['union_bound_factor'] = ds_stats['numitems'] * math.log(2.0)
     if use_additional_knowledge and \
@@ -56,35 +56,23 @@ def get_trueFIs(ds_stats, res_filename, min_freq, delta, pvalue_mode,
     stats['critical_value'] = math.log(delta) - stats['union_bound_factor']
     supposed_freq = (math.ceil(ds_stats['size'] * min_freq) - 1) / \
         ds_stats['size']
-    trueFIs = dict()
-    last_accepted_freq = 1.0
-    last_non_accepted_freq = min_freq
-    for itemset in sorted(sample_res.keys(), key=lambda x: sample_res[x],
-                          reverse=True):
-        p_value = utils.pvalue(pvalue_mode, sample_res[itemset],
-                               ds_stats['size'], supposed_freq)
-        if p_value <= stats['critical_value']:
-            trueFIs[itemset] = sample_res[itemset]
-            last_accepted_freq = sample_res[itemset]
-        else:
-            # Compute epsilon for the binomial
-            last_non_accepted_freq = sample_res[itemset]
-            break
-
-    min_diff = 1e-5  # controls when to stop the binary search
-    while last_accepted_freq - last_non_accepted_freq > min_diff:
-        mid_point = (last_accepted_freq - last_non_accepted_freq) / 2
-        test_freq = last_non_accepted_freq + mid_point
-        p_value = utils.pvalue(pvalue_mode, test_freq,
-                               ds_stats['size'], supposed_freq)
-        if p_value <= stats['critical_value']:
-            last_accepted_freq = test_freq
-        else:
-            last_non_accepted_freq = test_freq
-
-    stats['epsilon'] = last_non_accepted_freq + \
-        ((last_accepted_freq - last_non_accepted_freq) / 2) - min_freq
-    stats['removed'] = len(sample_res) - len(trueFIs)
+    # The TFIs are the itemsets with support at least the minimum accepted
+    # support. The itemsets come from the most frequent to the least
+    # frequent, so they are a prefix of the results, and only that is read.
+    supports = utils.get_results_supports(res_filename, min_freq)
+    accepted_num = thresholds.count_accepted(
+        supports, thresholds.get_min_accepted_support(
+            pvalue_mode, ds_stats['size'], supposed_freq,
+            stats['critical_value']))
+    trueFIs = dict(itertools.islice(utils.iter_results(res_filename,
+                                                       min_freq),
+                                    accepted_num))
+
+    # Compute epsilon for the binomial
+    stats['epsilon'] = thresholds.get_epsilon(
+        pvalue_mode, ds_stats['size'], supposed_freq, stats['critical_value'],
+        min_freq)
+    stats['removed'] = len(supports) - len(trueFIs)
 
     return (trueFIs, stats)
 
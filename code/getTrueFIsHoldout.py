@@ -19,7 +19,7 @@
 import math
 import os.path
 import sys
-import utils
+import thresholds, utils
 
 
 def get_trueFIs(exp_res_filename, eval_res_filename, min_freq, delta,
@@ -50,47 +50,11 @@ def get_trueFIs(exp_res_filename, eval_res_filename, min_freq, delta,
 
     stats = dict()
 
-    with open(exp_res_filename) as FILE:
-        size_line = FILE.readline()
-        try:
-            size_str = size_line.split("(")[1].split(")")[0]
-        except IndexError:
-            utils.error_exit(
-                " ".join(
-                    ("Cannot compute size of the explore dataset:",
-                        "'{}' is not in a recognized format\n".format(
-                            size_line))))
-        try:
-            stats['exp_size'] = int(size_str)
-        except ValueError:
-            utils.error_exit(
-                " ".join(
-                    ("Cannot compute size of the explore dataset:",
-                     "'{}' is not a number\n".format(size_str))))
-
-    with open(eval_res_filename) as FILE:
-        size_line = FILE.readline()
-        try:
-            size_str = size_line.split("(")[1].split(")")[0]
-        except IndexError:
-            utils.error_exit(
-                " ".join(
-                    ("Cannot compute size of the eval dataset:",
-                     "'{}' is not in a recognized format\n".format(
-                         size_line))))
-        try:
-            stats['eval_size'] = int(size_str)
-        except ValueError:
-            utils.error_exit(
-                " ".join(
-                    "Cannot compute size of the eval dataset:",
-                    "'{}' is not a number\n".format(size_str)))
+    stats['exp_size'] = utils.get_results_size(exp_res_filename)
+    stats['eval_size'] = utils.get_results_size(eval_res_filename)
 
     stats['orig_size'] = stats['exp_size'] + stats['eval_size']
 
-    exp_res = utils.create_results(exp_res_filename, min_freq)
-    stats['exp_res'] = len(exp_res)
-
     trueFIs = dict()
 
     supposed_freq = (math.ceil( stats['orig_size'] * min_freq) - 1) / stats['orig_size']
@@ -99,78 +63,65 @@ def get_trueFIs(exp_res_filename, eval_res_filename, min_freq, delta,
         stats['lowered_delta'] = 1 - math.sqrt(1 - delta)
         exp_res_filtered = dict()
         stats['filter_critical_value'] = math.log(stats['lowered_delta']) - do_filter
-        last_accepted_freq = 1.0
-        last_non_accepted_freq = 0.0
-        for itemset in exp_res:
-            if utils.pvalue(pvalue_mode, exp_res[itemset], stats['exp_size'],
-                    supposed_freq) <= stats['filter_critical_value']:
-                trueFIs[itemset] = exp_res[itemset]
-                if exp_res[itemset] < last_accepted_freq:
-                    last_accepted_freq = exp_res[itemset]
+        # The accepted itemsets are those with support at least the minimum
+        # accepted support.
+        supports = utils.get_results_supports(exp_res_filename, min_freq)
+        accepted = supports >= thresholds.get_min_accepted_support(
+                pvalue_mode, stats['exp_size'], supposed_freq,
+                stats['filter_critical_value'])
+        stats['exp_res'] = len(supports)
+        for ((itemset, freq), is_accepted) in zip(
+                utils.iter_results(exp_res_filename, min_freq),
+                accepted.tolist()):
+            if is_accepted:
+                trueFIs[itemset] = freq
             else:
-                exp_res_filtered[itemset] = exp_res[itemset]
-                if exp_res[itemset] > last_non_accepted_freq:
-                    last_non_accepted_freq = exp_res[itemset]
+                exp_res_filtered[itemset] = freq
         # Compute epsilon for the binomial
-        min_diff = 5e-6 # controls when to stop the binary search
-        while last_accepted_freq - last_non_accepted_freq > min_diff:
-            mid_point = (last_accepted_freq - last_non_accepted_freq) / 2
-            test_freq = last_non_accepted_freq + mid_point
-            p_value = utils.pvalue(pvalue_mode, test_freq,
-                    stats['eval_size'], supposed_freq)
-            if p_value <= stats['filter_critical_value']:
-                last_accepted_freq = test_freq
-            else:
-                last_non_accepted_freq = test_freq
-        stats['filter_epsilon'] = last_non_accepted_freq + ((last_accepted_freq - last_non_accepted_freq) / 2) - min_freq
+        stats['filter_epsilon'] = thresholds.get_epsilon(pvalue_mode,
+                stats['exp_size'], supposed_freq,
+                stats['filter_critical_value'], min_freq, 0.0)
     else:
         stats['lowered_delta'] = delta
-        exp_res_filtered = exp_res
+        exp_res_filtered = utils.create_results(exp_res_filename, min_freq)
+        stats['exp_res'] = len(exp_res_filtered)
         stats['filter_epsilon'] = 1.0
-    exp_res_filtered_set = set(exp_res_filtered.keys())
-    stats['exp_res_filtered'] = len(exp_res_filtered_set)
+    stats['exp_res_filtered'] = len(exp_res_filtered)
     stats['tfis_from_exp'] = len(trueFIs)
     sys.stderr.write("do_filter: {}, tfis_from_exp: {}, exp_res_filtered: {}\n".format(do_filter, stats['tfis_from_exp'], stats['exp_res_filtered']))
 
     if stats['exp_res_filtered'] > 0:
-        eval_res = utils.create_results(eval_res_filename, min_freq)
-        eval_res_set = set(eval_res.keys())
-        stats['eval_res'] = len(eval_res)
-
-        intersection = exp_res_filtered_set & eval_res_set
+        # Only keep the itemsets from the eval results that we need, i.e.,
+        # those in the intersection with the filtered explore results. They
+        # come from the most frequent to the least frequent.
+        stats['eval_res'] = 0
+        intersection = []
+        intersection_supports = []
+        for (itemset, freq) in utils.iter_results(eval_res_filename, min_freq):
+            stats['eval_res'] += 1
+            if itemset in exp_res_filtered:
+                intersection.append((itemset, freq))
+                intersection_supports.append(round(freq * stats['eval_size']))
         stats['holdout_intersection'] = len(intersection)
-        stats['holdout_false_negatives'] = len(exp_res_filtered_set - eval_res_set)
+        stats['holdout_false_negatives'] = stats['exp_res_filtered'] - \
+            len(intersection)
 
         # Bonferroni correction (Union bound). We work in the log space.
         stats['critical_value'] = math.log(stats['lowered_delta']) - math.log(stats['exp_res_filtered'])
 
-        # Add TFIs from eval
-        last_accepted_freq = 1.0
-        last_non_accepted_freq = min_freq
-        for itemset in sorted(intersection, key=lambda x : eval_res[x], reverse=True):
-            p_value = utils.pvalue(pvalue_mode, eval_res[itemset],
-                    stats['eval_size'], supposed_freq)
-            if p_value <= stats['critical_value']:
-                trueFIs[itemset] = eval_res[itemset]
-                last_accepted_freq = eval_res[itemset]
-            else:
-                last_non_accepted_freq = eval_res[itemset]
-                break
+        # Add TFIs from eval: the itemsets of the intersection (sorted by
+        # decreasing support) with support at least the minimum accepted
+        # support.
+        accepted_num = thresholds.count_accepted(
+            intersection_supports,
+            thresholds.get_min_accepted_support(pvalue_mode,
+                stats['eval_size'], supposed_freq, stats['critical_value']))
+        trueFIs.update(intersection[:accepted_num])
 
         # Compute epsilon for the binomial
-        min_diff = 5e-6 # controls when to stop the binary search
-        while last_accepted_freq - last_non_accepted_freq > min_diff:
-            mid_point = (last_accepted_freq - last_non_accepted_freq) / 2
-            test_freq = last_non_accepted_freq + mid_point
-            p_value = utils.pvalue(pvalue_mode, test_freq,
-                    stats['eval_size'], supposed_freq)
-            if p_value <= stats['critical_value']:
-                last_accepted_freq = test_freq
-            else:
-                last_non_accepted_freq = test_freq
-
-        stats['epsilon'] = last_non_accepted_freq + ((last_accepted_freq -
-            last_non_accepted_freq) / 2) - min_freq
+        stats['epsilon'] = thresholds.get_epsilon(pvalue_mode,
+                stats['eval_size'], supposed_freq, stats['critical_value'],
+                min_freq)
         stats['removed'] = len(intersection) - len(trueFIs)
     else: # stats['exp_res_filtered'] == 0
         stats['eval_res'] = 0
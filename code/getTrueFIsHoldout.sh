@@ -61,8 +61,10 @@ if [ ${EVAL_RES:-empty} = "empty" ]; then
 	RESULTS_FILE_BASE="${BASEDATASETNAME}_t${MIN_FREQ}"
 	EVAL_RES="${RESULTS_FILE_BASE}_eval.res"
 	EXPL_RES="${RESULTS_FILE_BASE}_expl.res"
-	sh ${SCRIPTS_BASE}/minedb-gra.sh ${SUPP} ${SAMPLES_BASE}/${BASEDATASETNAME}_expl.dat ${RESULTS_BASE}/${EXPL_RES} > /dev/null
-	sh ${SCRIPTS_BASE}/minedb-gra.sh ${SUPP} ${SAMPLES_BASE}/${BASEDATASETNAME}_eval.dat ${RESULTS_BASE}/${EVAL_RES} > /dev/null
+	# Mine the two parts in parallel
+	sh ${SCRIPTS_BASE}/minedb-gra.sh ${SUPP} ${SAMPLES_BASE}/${BASEDATASETNAME}_expl.dat ${RESULTS_BASE}/${EXPL_RES} > /dev/null &
+	sh ${SCRIPTS_BASE}/minedb-gra.sh ${SUPP} ${SAMPLES_BASE}/${BASEDATASETNAME}_eval.dat ${RESULTS_BASE}/${EVAL_RES} > /dev/null &
+	wait
 fi
 echo "done" >&2
 
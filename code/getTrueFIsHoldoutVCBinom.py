@@ -16,7 +16,7 @@
 # limitations under the License.
 
 import locale, math, os.path, subprocess, sys, tempfile
-import epsilon, utils
+import epsilon, thresholds, utils
 
 
 def get_trueFIs(exp_res_filename, eval_res_filename, min_freq, delta, pvalue_mode, first_epsilon=1.0):
@@ -27,27 +27,8 @@ def get_trueFIs(exp_res_filename, eval_res_filename, min_freq, delta, pvalue_mod
 
     stats = dict()
 
-    with open(exp_res_filename) as FILE:
-        size_line = FILE.readline()
-        try:
-            size_str = size_line.split("(")[1].split(")")[0]
-        except IndexError:
-            utils.error_exit("Cannot compute size of the explore dataset: '{}' is not in the recognized format\n".format(size_line))
-        try:
-            stats['exp_size'] = int(size_str)
-        except ValueError:
-            utils.error_exit("Cannot compute size of the explore dataset: {} is not a number\n".format(size_str))
-
-    with open(eval_res_filename) as FILE:
-        size_line = FILE.readline()
-        try:
-            size_str = size_line.split("(")[1].split(")")[0]
-        except IndexError:
-            utils.error_exit("Cannot compute size of the eval dataset: '{}' is not in the recognized format\n".format(size_line))
-        try:
-            stats['eval_size'] = int(size_str)
-        except ValueError:
-            utils.error_exit("Cannot compute size of the eval dataset: '{}' is not a number\n".format(size_str))
+    stats['exp_size'] = utils.get_results_size(exp_res_filename)
+    stats['eval_size'] = utils.get_results_size(eval_res_filename)
 
     stats['orig_size'] = stats['exp_size'] + stats['eval_size']
 
@@ -101,33 +82,21 @@ def get_trueFIs(exp_res_filename, eval_res_filename, min_freq, delta, pvalue_mod
         # Bonferroni correction (Union bound). We work in the log space.
         stats['critical_value'] = math.log(stats['lowered_delta']) - math.log(stats['exp_res_filtered'])
 
-        # Add TFIs from eval
-        last_accepted_freq = 1.0
-        last_non_accepted_freq = min_freq
-        for itemset in sorted(intersection, key=lambda x : eval_res[x], reverse=True):
-            p_value = utils.pvalue(pvalue_mode, eval_res[itemset],
-                    stats['eval_size'], supposed_freq)
-            if p_value <= stats['critical_value']:
-                trueFIs[itemset] = eval_res[itemset]
-                last_accepted_freq = eval_res[itemset]
-            else:
-                last_non_accepted_freq = eval_res[itemset]
-                break
+        # Add TFIs from eval: the itemsets of the intersection with support
+        # at least the minimum accepted support.
+        sorted_intersection = sorted(intersection, key=lambda x : eval_res[x], reverse=True)
+        accepted_num = thresholds.count_accepted(
+            [round(eval_res[x] * stats['eval_size']) for x in
+                sorted_intersection],
+            thresholds.get_min_accepted_support(pvalue_mode,
+                stats['eval_size'], supposed_freq, stats['critical_value']))
+        for itemset in sorted_intersection[:accepted_num]:
+            trueFIs[itemset] = eval_res[itemset]
 
         # Compute epsilon for the binomial
-        min_diff = 5e-6 # controls when to stop the binary search
-        while last_accepted_freq - last_non_accepted_freq > min_diff:
-            mid_point = (last_accepted_freq - last_non_accepted_freq) / 2
-            test_freq = last_non_accepted_freq + mid_point
-            p_value = utils.pvalue(pvalue_mode, test_freq,
-                    stats['eval_size'], supposed_freq)
-            if p_value <= stats['critical_value']:
-                last_accepted_freq = test_freq
-            else:
-                last_non_accepted_freq = test_freq
-
-        stats['epsilon'] = last_non_accepted_freq + ((last_accepted_freq -
-            last_non_accepted_freq) / 2) - min_freq
+        stats['epsilon'] = thresholds.get_epsilon(pvalue_mode,
+                stats['eval_size'], supposed_freq, stats['critical_value'],
+                min_freq)
         stats['removed'] = len(intersection) - len(trueFIs)
     else: # stats['exp_res_filtered'] == 0
         stats['eval_res'] = 0
@@ -63,15 +63,21 @@ if [ ${EVAL_RES:-empty} = "empty" ]; then
 	RESULTS_FILE_BASE="${BASEDATASETNAME}_t${MIN_FREQ}"
 	EVAL_RES="${RESULTS_FILE_BASE}_eval.res"
 	EXPL_RES="${RESULTS_FILE_BASE}_expl.res"
-	sh ${SCRIPTS_BASE}/minedb-gra.sh ${SUPP} ${SAMPLES_BASE}/${BASEDATASETNAME}_expl.dat ${RESULTS_BASE}/${EXPL_RES} > /dev/null
-	sh ${SCRIPTS_BASE}/minedb-gra.sh ${SUPP} ${SAMPLES_BASE}/${BASEDATASETNAME}_eval.dat ${RESULTS_BASE}/${EVAL_RES} > /dev/null
+	# Mine the two parts in parallel
+	sh ${SCRIPTS_BASE}/minedb-gra.sh ${SUPP} ${SAMPLES_BASE}/${BASEDATASETNAME}_expl.dat ${RESULTS_BASE}/${EXPL_RES} > /dev/null &
+	sh ${SCRIPTS_BASE}/minedb-gra.sh ${SUPP} ${SAMPLES_BASE}/${BASEDATASETNAME}_eval.dat ${RESULTS_BASE}/${EVAL_RES} > /dev/null &
+	wait
 fi
 echo "done" >&2
 
 # Compute the True FIs
-LOWER_DELTA=`echo "scale=10; d = 1 - sqrt(1 - 0.${DELTA}); print d" | bc -l | cut -d . -f 2`
-ORIG_EPSILON=`${PYTHON3} ${SCRIPTS_BASE}/epsilon.py ${USE_ADD_KNOWL} 0.${LOWER_DELTA} ${DATASET} | tail -1 |cut -f 1`
-EPSILON=`echo "scale=scale(${ORIG_EPSILON}); ${ORIG_EPSILON} * sqrt(2)" | bc -l`
+# runExperiment.sh passes the epsilon of the first step as the optional sixth
+# argument, as it is the same for all the frequencies.
+FIRST_EPSILON=$6
+if [ -z "${FIRST_EPSILON}" ]; then
+	FIRST_EPSILON=`${PYTHON3} ${SCRIPTS_BASE}/epsilon.py -l ${USE_ADD_KNOWL} 0.${DELTA} ${DATASET} | tail -1 |cut -f 1`
+fi
+EPSILON=`echo "scale=scale(${FIRST_EPSILON}); ${FIRST_EPSILON} * sqrt(2)" | bc -l`
 
 echo "Getting TFIs..." >&2
 ${PYTHON3} ${SCRIPTS_BASE}/getTrueFIsHoldoutVCBinom.py ${EPSILON} 0.${DELTA} 0.${MIN_FREQ} ${MODE} ${RESULTS_BASE}/${EXPL_RES} ${RESULTS_BASE}/${EVAL_RES}
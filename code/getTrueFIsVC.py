@@ -16,19 +16,72 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import locale
 import math
 import os
 import os.path
-import subprocess
 import sys
-import tempfile
-import networkx as nx
+import bounds
+import chains
 import epsilon
 import getDatasetInfo
+import negativeborder
+import sukp
 import utils
 
 
+def get_vc_dim(optimal_sol_upp_bound, negative_border_len):
+    """ Return the bound to the VC-dimension given by an upper bound to the
+    optimal value of the optimization problem, which can not be larger than
+    log2(negative_border_len). """
+    return min(int(math.floor(math.log2(optimal_sol_upp_bound))) + 1,
+               int(math.floor(math.log2(negative_border_len))))
+
+
+def get_emp_vc_dim(model, cand_len_longer_equal, gap, negative_border_len):
+    """ Compute the empirical VC-dimension using the capacity cand_len, where
+    cand_len_longer_equal is the pair (cand_len, longer_equal).
+
+    The optimization problem is not solved if the cheap bounds to its optimal
+    value (see bounds.py) give the same VC-dimension.
+
+    Return a triple (emp_vc_dim, optimal_sol_upp_bound_emp, gap), where
+    'gap' is the relative gap of the solution (0 if the problem was not
+    solved)."""
+    (cand_len, longer_equal) = cand_len_longer_equal
+    (lower_bound, upper_bound, greedy_solution) = bounds.get_bounds(model,
+                                                                    cand_len)
+    sys.stderr.write("lower_bound={} upper_bound={}\n".format(lower_bound,
+                                                              upper_bound))
+    if lower_bound > 0 and get_vc_dim(lower_bound, negative_border_len) == \
+            get_vc_dim(upper_bound, negative_border_len):
+        sys.stderr.write("Bounds give the VC-dimension, skipping solve\n")
+        optimal_sol_upp_bound_emp = upper_bound
+        solution_gap = 0
+    else:
+        # Solve the problem with the new capacity.
+        solution = model.solve_capacity(cand_len, gap, upper_bound=upper_bound,
+                                        start=greedy_solution)
+        sys.stderr.write("{}\n".format(solution))
+        optimal_sol_upp_bound_emp = int(
+            math.floor(solution.best_bound * (1 + solution.gap)))
+        solution_gap = solution.gap
+
+    emp_vc_dim = int(math.floor(math.log2(optimal_sol_upp_bound_emp))) + 1
+    if emp_vc_dim > math.log2(negative_border_len):
+        sys.stderr.write("Lowering VC-dimension to maximum value\n")
+        emp_vc_dim = int(math.floor(math.log2(negative_border_len)))
+
+    sys.stderr.write(
+        " ".join(
+            ("cand_len={}".format(cand_len),
+             "longer_equal={}".format(longer_equal),
+             "emp_vc_dim={}".format(emp_vc_dim),
+             "optimal_sol_upp_bound_emp={}\n".format(
+                 optimal_sol_upp_bound_emp))))
+    sys.stderr.flush()
+    return (emp_vc_dim, optimal_sol_upp_bound_emp, solution_gap)
+
+
 def get_trueFIs(ds_stats, res_filename, min_freq, delta, gap=0.0,
                 use_additional_knowledge=False):
     """ Compute the True Frequent Itemsets using the VC method we present in the
@@ -37,9 +90,8 @@ def get_trueFIs(ds_stats, res_filename, min_freq, delta, gap=0.0,
     The parameter 'use_additional_knowledge' can be used to incorporate
     additional knowledge about the data generation process.
 
-    'gap' controls how close to the optimal solution we ask the CPLEX solver to
-    go. The right way to implement this would be to use a
-    user-defined function in CPLEX.
+    'gap' controls how close to the optimal solution we ask the solver (see
+    sukp.py) to go.
 
     Returns a pair (trueFIs, stats).
     'trueFIs' is a dict whose keys are itemsets (frozensets) and values are
@@ -55,27 +107,7 @@ def get_trueFIs(ds_stats, res_filename, min_freq, delta, gap=0.0,
     lower_delta = 1.0 - math.sqrt(1 - delta)
 
     # Compute the maximum frequency of an itemset in the dataset
-    with open(res_filename, 'rt') as FILE:
-        size_line = FILE.readline()
-        try:
-            size_str = size_line.split("(")[1].split(")")[0]
-        except IndexError:
-            error_exit("Cannot compute size of the dataset: '{}' is not in the recognized format\n".format(size_line))
-        try:
-            size = int(size_str)
-        except ValueError:
-            error_exit("Cannot compute size of the dataset: '{}' is not a number\n".format(size_line.split("(")[1].split(")")[0]))
-        max_freq_line = FILE.readline()
-        if max_freq_line.find("(") > -1:
-            tokens = max_freq_line.split("(")
-            itemset = frozenset(map(int, tokens[0].split()))
-            try:
-                support = int(tokens[1][:-2])
-            except ValueError:
-                error_exit("Cannot compute the maximum frequency: '{}' is not a number\n".format(tokens[1][:-2]))
-            max_freq = support / size
-        else:
-            error_exit("Cannot compute the maximum frequency: '{}' is not in the recognized format\n".format(max_freq_line))
+    max_freq = utils.get_max_freq(res_filename)
 
     # Compute the first epsilon using results from the paper (Riondato and
     # Upfal 2014)
@@ -108,9 +140,6 @@ def get_trueFIs(ds_stats, res_filename, min_freq, delta, gap=0.0,
         len(freq_itemsets_1_set)))
     sys.stderr.flush()
 
-    constr_start_str = "cplex.SparsePair(ind = ["
-    constr_end_str = "], val = vals)"
-
     # Compute the "base set" (terrible name), that is the set of
     # itemsets with frequency < min_freq + epsilon_1 (but greater than min_freq
     # - stats['epsilon_1']. In the paper we call it \mathcal{G}.
@@ -154,47 +183,13 @@ def get_trueFIs(ds_stats, res_filename, min_freq, delta, gap=0.0,
     # Compute the negative border
     sys.stderr.write("Computing negative border...")
     sys.stderr.flush()
-    negative_border = set()
+    # The idea is to look for "siblings" of maximal itemsets. See
+    # negativeborder.py for the details.
+    negative_border = negativeborder.get_negative_border(
+        freq_itemsets_1_set, maximal_itemsets)
     negative_border_items = set()
-    # The idea is to look for "children" of maximal itemsets, and for
-    # "siblings" of maximal itemsets
-    for maximal in maximal_itemsets:
-        for item_to_remove_from_maximal in maximal:
-            reduced_maximal = maximal - frozenset(
-                [item_to_remove_from_maximal, ])
-            for item in freq_items_1:
-                if item in maximal:
-                    continue
-                # Create sibling
-                candidate = reduced_maximal | frozenset([item])
-                if candidate in freq_itemsets_1_set:
-                    continue
-                if candidate in negative_border:
-                    continue
-                to_add = True
-                for item_to_remove in candidate:
-                    subset = candidate - frozenset([item_to_remove])
-                    if subset not in freq_itemsets_1_set:
-                        to_add = False
-                        break
-                if to_add:
-                    negative_border.add(candidate)
-                    negative_border_items |= candidate
-                if not to_add:
-                    # if we added the sibling, there's no way we can add the
-                    # child
-                    candidate2 = maximal | frozenset([item])  # create child
-                    if candidate2 in negative_border:
-                        continue
-                    to_add = True
-                    for item_to_remove in candidate2:
-                        subset = candidate2 - frozenset([item_to_remove])
-                        if subset not in freq_itemsets_1_set:
-                            to_add = False
-                            break
-                    if to_add:
-                        negative_border.add(candidate2)
-                        negative_border_items |= candidate
+    for itemset in negative_border:
+        negative_border_items |= itemset
     # We don't need to add the non-frequent-items because none of them (or
     # their supersets) will ever be included in the output, so at most we lose
     # some statistical power, but it's not a problem of avoiding false
@@ -221,39 +216,16 @@ def get_trueFIs(ds_stats, res_filename, min_freq, delta, gap=0.0,
     stats['negative_border'] = len(negative_border)
     negative_border_items_sorted = sorted(negative_border_items)
 
-    # Create the graph that we will use to compute the chain constraints.
-    # The nodes are the itemsets in negative_border. There is an edge between
-    # two nodes if one is contained in the other or vice-versa.
-    # Cliques on this graph are chains.
-    sys.stderr.write("Creating graph...")
-    sys.stderr.flush()
-    graph = nx.Graph()
-    graph.add_nodes_from(negative_border)
-    sys.stderr.write("added nodes...adding edges...")
-    sys.stderr.flush()
-
+    # Index the itemsets in negative_border and the sets containing each
+    # item. The chain constraints are computed later from the containment
+    # order of the itemsets (see chains.py).
     negative_border_items_in_sets_dict = dict()
-    negative_border_itemset_index = 0
-    itemset_indexes_dict = dict()
-    for first_itemset_index in range(stats['negative_border']):
-        first_itemset = negative_border[first_itemset_index]
-        for second_itemset_index in range(first_itemset_index + 1,
-                                          stats['negative_border']):
-            second_itemset = negative_border[second_itemset_index]
-            if first_itemset < second_itemset or \
-                    second_itemset < first_itemset:
-                graph.add_edge(first_itemset, second_itemset)
-        for item in first_itemset:
+    for itemset_index in range(stats['negative_border']):
+        for item in negative_border[itemset_index]:
             if item in negative_border_items_in_sets_dict:
-                negative_border_items_in_sets_dict[item].append(
-                    negative_border_itemset_index)
+                negative_border_items_in_sets_dict[item].append(itemset_index)
             else:
-                negative_border_items_in_sets_dict[item] = \
-                    [negative_border_itemset_index, ]
-        itemset_indexes_dict[first_itemset] = negative_border_itemset_index
-        negative_border_itemset_index += 1
-    sys.stderr.write("done\n")
-    sys.stderr.flush()
+                negative_border_items_in_sets_dict[item] = [itemset_index, ]
 
     capacity = freq_items_1_num - 1
     if use_additional_knowledge and 2 * ds_stats['maxlen'] < capacity:
@@ -262,235 +234,96 @@ def get_trueFIs(ds_stats, res_filename, min_freq, delta, gap=0.0,
         sys.stderr.flush()
         capacity = 2 * ds_stats['maxlen']
 
-    vars_num = stats['negative_border'] + len(negative_border_items)
-    constr_names = []
-
-    (tmpfile_handle, tmpfile_name) = tempfile.mkstemp(
-        prefix="cplx", dir=os.environ['PWD'], text=True)
-    os.close(tmpfile_handle)
-    with open(tmpfile_name, 'wt') as cplex_script:
-        cplex_script.write("capacity = {}\n".format(capacity))
-        cplex_script.write("import cplex, os, sys\n")
-        cplex_script.write("from cplex.exceptions import CplexError\n")
-        cplex_script.write("\n")
-        cplex_script.write("\n")
-        cplex_script.write(
-            " ".join(
-                ("os.environ[\"ILOG_LICENSE_FILE\"] =",
-                 "\"/local/projects/cplex/ilm/site.access.ilm\"\n")))
-        cplex_script.write("vals = [-1.0, 1.0]\n")
-        cplex_script.write("sets_num = {}\n".format(stats['negative_border']))
-        cplex_script.write("items_num = {}\n".format(
-            len(negative_border_items)))
-        cplex_script.write("vars_num = {}\n".format(vars_num))
-        cplex_script.write("my_ub = [1.0] * vars_num\n")
-        cplex_script.write(
-            "my_types = \"\".join(\"I\" for i in range(vars_num))\n")
-        cplex_script.write(
-            "my_obj = ([1.0] * sets_num) + ([0.0] * items_num)\n")
-        cplex_script.write(
-            " ".join(
-                ("my_colnames =",
-                 "[\"set{0}\".format(i) for i in range(sets_num)] +",
-                 "[\"item{0}\".format(j) for j in range(items_num)]\n")))
-        cplex_script.write("rows = [ ")
-
-        sys.stderr.write("Writing knapsack constraints...")
-        sys.stderr.flush()
-        constr_num = 0
-        for item_index in range(len(negative_border_items)):
-            try:
-                for itemset_index in negative_border_items_in_sets_dict[
-                        negative_border_items_sorted[item_index]]:
-                    constr_str = "".join(
-                        (constr_start_str,
-                         "\"set{}\",\"item{}\"".format(
-                             itemset_index, item_index), constr_end_str))
-                    cplex_script.write("{},".format(constr_str))
-                    constr_num += 1
-                    name = "s{}i{}".format(item_index, itemset_index)
-                    constr_names.append(name)
-            except KeyError:
-                sys.stderr.write(
-                    " ".join(
-                        ("item_index={}".format(item_index),
-                         "neg_border_items_sorted[item_index]={}\n".format(
-                            negative_border_items_sorted[item_index]))))
-                sys.stderr.write("{} in items: {}\n".format(
-                    negative_border_items_sorted[item_index],
-                    negative_border_items_sorted[item_index] in items))
-                sys.stderr.write("{} in freq_items_1: {}\n".format(
+    # Create the optimization problem. See sukp.py.
+    sys.stderr.write("Creating knapsack constraints...")
+    sys.stderr.flush()
+    pair_sets = []
+    pair_items = []
+    for item_index in range(len(negative_border_items)):
+        try:
+            for itemset_index in negative_border_items_in_sets_dict[
+                    negative_border_items_sorted[item_index]]:
+                pair_sets.append(itemset_index)
+                pair_items.append(item_index)
+        except KeyError:
+            sys.stderr.write(
+                " ".join(
+                    ("item_index={}".format(item_index),
+                     "neg_border_items_sorted[item_index]={}\n".format(
+                        negative_border_items_sorted[item_index]))))
+            sys.stderr.write("{} in items: {}\n".format(
+                negative_border_items_sorted[item_index],
+                negative_border_items_sorted[item_index] in items))
+            sys.stderr.write("{} in freq_items_1: {}\n".format(
+                negative_border_items_sorted[item_index],
+                negative_border_items_sorted[item_index] in freq_items_1))
+            non_freq_items_1 = items - freq_items_1
+            sys.stderr.write("{} in non_freq_items_1: {}\n".format(
+                negative_border_items_sorted[item_index],
+                negative_border_items_sorted[item_index] in
+                non_freq_items_1))
+            in_pos_border = False
+            pos_border_itemset = frozenset()
+            for itemset in maximal_itemsets:
+                if negative_border_items_sorted[item_index] in itemset:
+                    in_pos_border = True
+                    pos_border_itemset = itemset
+                    break
+            sys.stderr.write(
+                "{} in maximal_itemsets: {}. Itemset: {}\n".format(
                     negative_border_items_sorted[item_index],
-                    negative_border_items_sorted[item_index] in freq_items_1))
-                non_freq_items_1 = items - freq_items_1
-                sys.stderr.write("{} in non_freq_items_1: {}\n".format(
+                    in_pos_border, pos_border_itemset))
+            in_neg_border = False
+            neg_border_itemset = frozenset()
+            for itemset in negative_border:
+                if negative_border_items_sorted[item_index] in itemset:
+                    in_neg_border = True
+                    neg_border_itemset = itemset
+                    break
+            sys.stderr.write(
+                "{} in negative_border: {}. Itemset: {}\n".format(
                     negative_border_items_sorted[item_index],
-                    negative_border_items_sorted[item_index] in
-                    non_freq_items_1))
-                in_pos_border = False
-                pos_border_itemset = frozenset()
-                for itemset in maximal_itemsets:
-                    if negative_border_items_sorted[item_index] in itemset:
-                        in_pos_border = True
-                        pos_border_itemset = itemset
-                        break
-                sys.stderr.write(
-                    "{} in maximal_itemsets: {}. Itemset: {}\n".format(
-                        negative_border_items_sorted[item_index],
-                        in_pos_border, pos_border_itemset))
-                in_neg_border = False
-                neg_border_itemset = frozenset()
-                for itemset in negative_border:
-                    if negative_border_items_sorted[item_index] in itemset:
-                        in_neg_border = True
-                        neg_border_itemset = itemset
-                        break
-                sys.stderr.write(
-                    "{} in negative_border: {}. Itemset: {}\n".format(
-                        negative_border_items_sorted[item_index],
-                        in_neg_border, neg_border_itemset))
-                sys.exit(1)
-
-        # Create capacity constraints and write it to script
-        constr_str = "".join(
-            (constr_start_str,
-             ",".join(
-                 "\"item{}\"".format(j) for j in range(
-                     len(negative_border_items))),
-                 "], val=[", ",".join(
-                     "1.0" for j in range(len(negative_border_items))), "])"))
-        cplex_script.write(constr_str)
-        last_tell = cplex_script.tell()
-        cplex_script.write(",")
-        cap_constr_name = "capacity"
-        constr_names.append(cap_constr_name)
-        sys.stderr.write("done\n")
-        sys.stderr.flush()
-
-        # Create chain constraints and write them to script
-        sys.stderr.write("Writing chain constraints...")
-        sys.stderr.flush()
-        chains_index = 0
-        for clique in nx.find_cliques(graph):
-            if len(clique) == 1:
-                continue
-            constr_str = "".join(
-                (constr_start_str,
-                 ",".join("\"set{}\"".format(j) for j in map(
-                     lambda x: itemset_indexes_dict[x], clique)),
-                 "], val=[1.0] * {}".format(len(clique)), ")"))
-            cplex_script.write(constr_str)
-            last_tell = cplex_script.tell()
-            cplex_script.write(",")
-            name = "chain{}".format(chains_index)
-            constr_names.append(name)
-            chains_index += 1
-        sys.stderr.write("done\n")
-        sys.stderr.flush()
+                    in_neg_border, neg_border_itemset))
+            sys.exit(1)
+    sys.stderr.write("done\n")
+    sys.stderr.flush()
 
-        sys.stderr.write(
-            " ".join(
-                ("Optimization problem: capacity={}".format(capacity),
-                 "vars_num={}".format(vars_num),
-                 "negative_border_size={}".format(stats['negative_border']),
-                 "negative_border_items_num={}".format(
-                    len(negative_border_items)),
-                 "constr_num={}".format(constr_num),
-                 "chains_index={}\n".format(chains_index))))
-        sys.stderr.flush()
+    # Create chain constraints
+    sys.stderr.write("Creating chain constraints...")
+    sys.stderr.flush()
+    model = sukp.Model(stats['negative_border'], len(negative_border_items),
+                       pair_sets, pair_items,
+                       chains.iter_maximal_chains(negative_border), capacity,
+                       maximal_chains=True)
+    sys.stderr.write("done\n")
+    sys.stderr.flush()
 
-        # Go back one character to remove last comma ","
-        cplex_script.seek(last_tell)
-        cplex_script.write("]\n")
-        cplex_script.write("my_rownames = {}\n".format(constr_names))
-        cplex_script.write("constr_num = {}\n".format(constr_num))
-        cplex_script.write("chain_constr_num = {}\n".format(chains_index))
-        cplex_script.write(
-            " ".join(
-                ("my_senses = [\"G\"] * constr_num +",
-                 "[\"L\"] + [\"L\"] * chain_constr_num\n")))
-        cplex_script.write(
-            " ".join(
-                ("my_rhs = [0.0] * constr_num + [capacity] +",
-                 "[1.0] * chain_constr_num\n")))
-        cplex_script.write("\n")
-        cplex_script.write("try:\n")
-        cplex_script.write("    prob = cplex.Cplex()\n")
-        cplex_script.write("    prob.set_error_stream(sys.stderr)\n")
-        cplex_script.write("    prob.set_log_stream(sys.stderr)\n")
-        cplex_script.write("    prob.set_results_stream(sys.stderr)\n")
-        cplex_script.write("    prob.set_warning_stream(sys.stderr)\n")
-        # cplex_script.write("    prob.parameters.mip.strategy.file.set(2)\n")
-        cplex_script.write(
-            "    prob.parameters.mip.tolerances.mipgap.set({})\n".format(gap))
-        cplex_script.write(
-            "    prob.parameters.timelimit.set({})\n".format(600))
-        # cplex_script.write("
-        # prob.parameters.mip.strategy.variableselect.set(3) # strong
-        # branching\n")
-        cplex_script.write(
-            "    prob.objective.set_sense(prob.objective.sense.maximize)\n")
-        cplex_script.write(
-            " ".join(
-                ("    prob.variables.add(obj = my_obj, ub = my_ub,",
-                 "types = my_types, names = my_colnames)\n")))
-        cplex_script.write(
-            " ".join(
-                ("    prob.linear_constraints.add(lin_expr = rows,",
-                 "senses = my_senses, rhs = my_rhs, names = my_rownames)\n")))
-        cplex_script.write(
-            " ".join(
-                ("    prob.MIP_starts.add(cplex.SparsePair(",
-                 "ind = [i for i in range(vars_num)],",
-                 "val = [1.0] * vars_num),",
-                 "prob.MIP_starts.effort_level.auto)\n")))
-        cplex_script.write("    prob.solve()\n")
-        cplex_script.write(
-            "".join(
-                ("    print (prob.solution.get_status(),",
-                 "prob.solution.status[prob.solution.get_status()],",
-                 "prob.solution.MIP.get_best_objective(),",
-                 "prob.solution.MIP.get_mip_relative_gap())\n")))
-        cplex_script.write("except CplexError, exc:\n")
-        cplex_script.write("    print exc\n")
-
-    # Run script, solve optimization problem, extract solution
-    my_environ = os.environ
-    if "ILOG_LICENSE_FILE" not in my_environ:
-        my_environ["ILOG_LICENSE_FILE"] = \
-            "/local/projects/cplex/ilm/site.access.ilm"
-    try:
-        cplex_output_binary_str = subprocess.check_output(
-            ["python2.6", tmpfile_name], env=my_environ,
-            cwd=os.environ["PWD"])
-    except subprocess.CalledProcessError as err:
-        os.remove(tmpfile_name)
-        utils.error_exit("CPLEX exited with error code {}: {}\n".format(
-            err.returncode, err.output))
-    # finally:
-    #    os.remove(tmpfile_name)
-
-    cplex_output = cplex_output_binary_str.decode(
-        locale.getpreferredencoding())
-    cplex_output_lines = cplex_output.split("\n")
-    cplex_solution_line = cplex_output_lines[
-        -1 if len(cplex_output_lines[-1]) > 0 else -2]
-    try:
-        cplex_solution = eval(cplex_solution_line)
-    except Exception:
-        utils.error_exit(
-            "Error evaluating the CPLEX solution line: {}\n".format(
-                cplex_solution_line))
+    sys.stderr.write(
+        " ".join(
+            ("Optimization problem: capacity={}".format(capacity),
+             "vars_num={}".format(model.vars_num),
+             "negative_border_size={}".format(stats['negative_border']),
+             "negative_border_items_num={}".format(
+                len(negative_border_items)),
+             "constr_num={}".format(model.pairs_num),
+             "chains_index={}\n".format(model.chains_num))))
+    sys.stderr.flush()
 
-    sys.stderr.write("cplex_solution={}\n".format(cplex_solution))
+    # Solve optimization problem, extract solution. The cheap bounds from
+    # bounds.py are used as cutoff and starting solution, and the solve is
+    # skipped if they match.
+    (lower_bound, upper_bound, greedy_solution) = bounds.get_bounds(model,
+                                                                    capacity)
+    sys.stderr.write("lower_bound={} upper_bound={}\n".format(lower_bound,
+                                                              upper_bound))
+    solution = model.solve_capacity(capacity, gap, upper_bound=upper_bound,
+                                    start=greedy_solution)
+    sys.stderr.write("solution={}\n".format(solution))
     sys.stderr.flush()
-    # if cplex_solution[0] not in (1, 101, 102):
-    #    utils.error_exit("CPLEX didn't find the optimal solution: {} {}
-    #    {}\n".format(cplex_solution[0], cplex_solution[1], cplex_solution[2]))
 
     # This is also an upper bound to the size of the true negative border
     optimal_sol_upp_bound = int(
-        math.floor(cplex_solution[2] * (1 + cplex_solution[3])))
+        math.floor(solution.best_bound * (1 + solution.gap)))
 
     # Compute non-empirical VC-dimension and first candidate to epsilon_2
     stats['not_emp_vc_dim'] = int(
@@ -510,8 +343,11 @@ def get_trueFIs(ds_stats, res_filename, min_freq, delta, gap=0.0,
              "not_emp_e2={}\n".format(not_emp_epsilon_2))))
     sys.stderr.flush()
 
-    # Loop to compute empirical VC-dimension using lengths distribution
-    items_num_str_len = len(str(len(negative_border_items) - 1))
+    # Compute the empirical VC-dimension using lengths distribution. The
+    # candidate capacities are the transaction lengths, in decreasing order,
+    # and we look for the first one such that the VC-dimension computed with
+    # it is not greater than the number of transactions at least as long.
+    cand_lens = []
     longer_equal = 0
     for i in range(len(lengths)):
         cand_len = lengths[i]
@@ -523,74 +359,68 @@ def get_trueFIs(ds_stats, res_filename, min_freq, delta, gap=0.0,
         # always true given that cand_len <= ds_stats['maxlen']
         if cand_len >= len(negative_border_items):
             cand_len = len(negative_border_items) - 1
-
-        # Modify the script to use the new capacity.
-        with open(tmpfile_name, 'r+t') as cplex_script:
-            cplex_script.seek(0)
-            cplex_script.write("capacity = {}\n".format(
-                str(cand_len).ljust(items_num_str_len)))
-        # Run the script, solve optimization problem, extract solution
-        my_environ = os.environ
-        if "ILOG_LICENSE_FILE" not in my_environ:
-            my_environ["ILOG_LICENSE_FILE"] = \
-                "/local/projects/cplex/ilm/site.access.ilm"
-        try:
-            cplex_output_binary_str = subprocess.check_output(
-                ["python2.6", tmpfile_name], env=my_environ,
-                cwd=os.environ["PWD"])
-        except subprocess.CalledProcessError as err:
-            os.remove(tmpfile_name)
-            utils.error_exit("CPLEX exited with error code {}: {}\n".format(
-                err.returncode, err.output))
-        # finally:
-        #    os.remove(tmpfile_name)
-
-        cplex_output = cplex_output_binary_str.decode(
-            locale.getpreferredencoding())
-        cplex_output_lines = cplex_output.split("\n")
-        cplex_solution_line = cplex_output_lines[
-            -1 if len(cplex_output_lines[-1]) > 0 else -2]
-        try:
-            cplex_solution = eval(cplex_solution_line)
-        except Exception:
-            utils.error_exit(
-                "Error evaluating the CPLEX solution line: {}\n".format(
-                    cplex_solution_line))
-
-        sys.stderr.write("{}\n".format(cplex_solution))
-        # if cplex_solution[0] not in (1, 101, 102):
-        #   utils.error_exit("CPLEX didn't find the optimal solution: {} {}
-        #   {}\n".format(cplex_solution[0], cplex_solution[1],
-        #   cplex_solution[2]))
-
-        # if cplex_solution[0] == 102:
-        optimal_sol_upp_bound_emp = int(
-            math.floor(cplex_solution[2] * (1 + cplex_solution[3])))
-        # else:
-        #    optimal_sol_upp_bound_emp = cplex_solution[0]
-
-        stats['emp_vc_dim'] = int(
-            math.floor(math.log2(optimal_sol_upp_bound_emp))) + 1
-        if stats['emp_vc_dim'] > math.log2(len(negative_border)):
-            sys.stderr.write("Lowering VC-dimension to maximum value\n")
-            stats['emp_vc_dim'] = int(
-                math.floor(math.log2(len(negative_border))))
-
-        sys.stderr.write(
-            " ".join(
-                ("cand_len={}".format(cand_len),
-                 "longer_equal={}".format(longer_equal),
-                 "emp_vc_dim={}".format(stats['emp_vc_dim']),
-                 "optimal_sol_upp_bound_emp={}\n".format(optimal_sol_upp_bound_emp))))
+        cand_lens.append((cand_len, longer_equal))
+
+    # Map the indexes of the candidates already probed to the triples
+    # returned by get_emp_vc_dim().
+    emp_vc_dims = dict()
+
+    def probe(index):
+        if index not in emp_vc_dims:
+            emp_vc_dims[index] = get_emp_vc_dim(
+                model, cand_lens[index], gap, len(negative_border))
+        return emp_vc_dims[index]
+
+    found = None
+    if gap == 0.0 and len(cand_lens) > 0:
+        # With exact solves, the VC-dimension does not increase as the
+        # capacity decreases, while longer_equal increases, so the stopping
+        # condition is monotone. The first candidate satisfying it is usually
+        # among the first ones, so we use exponential search: probe the
+        # candidates 0, 1, 3, 7, ... until the condition holds, then use
+        # binary search between the last two probes.
+        low = 0
+        high = len(cand_lens) - 1
+        probe_index = 0
+        while probe_index < high:
+            if probe(probe_index)[0] <= cand_lens[probe_index][1]:
+                high = probe_index
+                break
+            low = probe_index + 1
+            probe_index = 2 * probe_index + 1
+        while low < high:
+            middle = (low + high) // 2
+            if probe(middle)[0] <= cand_lens[middle][1]:
+                high = middle
+            else:
+                low = middle + 1
+        probe(low)
+        # If the solver did not reach gap 0 on some probe, the condition may
+        # not be monotone, and we fall back to the linear scan below.
+        if all(x[2] == 0 for x in emp_vc_dims.values()):
+            found = low
+        else:
+            sys.stderr.write("Inexact solution, using linear scan\n")
+            sys.stderr.flush()
+    if found is None:
+        for found in range(len(cand_lens)):
+            # If stopping condition is satisfied, exit.
+            if probe(found)[0] <= cand_lens[found][1]:
+                break
+    if len(cand_lens) == 0:
+        # All the transactions contain all the items: the capacities are not
+        # lower than the one of the non-empirical VC-dimension.
+        sys.stderr.write("No candidate capacities\n")
         sys.stderr.flush()
-
-        # If stopping condition is satisfied, exit.
-        if stats['emp_vc_dim'] <= longer_equal:
-            break
+        stats['emp_vc_dim'] = stats['not_emp_vc_dim']
+        optimal_sol_upp_bound_emp = optimal_sol_upp_bound
+        cand_len = capacity
+    else:
+        (stats['emp_vc_dim'], optimal_sol_upp_bound_emp) = \
+            emp_vc_dims[found][:2]
+        cand_len = cand_lens[found][0]
     # sys.stderr.write("{} {} {}\n".format(vc_dim_cand, vc_dim_cand2,
     # vc_dim_cand3))
-    os.remove(tmpfile_name)
-
     # Compute the bound to the shatter coefficient, which we use to compute
     # epsilon
     bound = min((math.log(optimal_sol_upp_bound), stats['emp_vc_dim'] *
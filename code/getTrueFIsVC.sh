@@ -28,8 +28,13 @@ DATASET=$5
 echo -n "Getting dataset stats..." >&2
 BASEDATASETNAME=`${PYTHON3} ${SCRIPTS_BASE}/getDatasetInfo.py name ${DATASET} | rev | cut -d . -f 2- | rev`
 SIZE=`${PYTHON3} ${SCRIPTS_BASE}/getDatasetInfo.py size ${DATASET}`
-LOWER_DELTA=`echo "scale=10; d = 1 - sqrt(1 - 0.${DELTA}); print d" | bc -l | cut -d . -f 2`
-EPSILON=`${PYTHON3} ${SCRIPTS_BASE}/epsilon.py ${USE_ADDIT_KNOWL} 0.${LOWER_DELTA} ${DATASET} | tail -1 | cut -f 1 | cut -d "." -f 2`
+# runExperiment.sh passes the epsilon of the first step as the optional sixth
+# argument, as it is the same for all the frequencies.
+FIRST_EPSILON=$6
+if [ -z "${FIRST_EPSILON}" ]; then
+	FIRST_EPSILON=`${PYTHON3} ${SCRIPTS_BASE}/epsilon.py -l ${USE_ADDIT_KNOWL} 0.${DELTA} ${DATASET} | tail -1 | cut -f 1`
+fi
+EPSILON=`echo ${FIRST_EPSILON} | cut -d "." -f 2`
 LOWER_SUPP=`echo "scale=scale(${EPSILON}); supp = ${SIZE} * (0.${MIN_FREQ} - 0.${EPSILON}); print supp" | bc -l | cut -d. -f 1`  
 if [ ${LOWER_SUPP} -le 0 ]; then
     echo "LOWER_SUPP=${LOWER_SUPP} less than 0. USE_ADDIT_KNOWL=${USE_ADDIT_KNOWL} MIN_FREQ=${MIN_FREQ} EPSILON=${EPSILON} DELTA=${DELTA}" >&2
@@ -0,0 +1,289 @@
+# Finding the True Frequent Itemsets
+#
+# Copyright 2014 Matteo Riondato <matteo@cs.brown.edu> and Fabio Vandin
+# <vandinfa@imada.sdu.dk>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compact, integer-encoded representation of collections of itemsets.
+
+An ItemMap maps the items to dense ids, ordered by decreasing item frequency,
+so that the most common items get the smallest ids. An itemset is encoded as
+the sorted tuple of the ids of its items.
+
+An ItemsetStore keeps a collection of encoded itemsets and their frequencies in
+a few contiguous arrays: the ids of all the itemsets one after the other
+(uint16 or uint32, depending on the number of items), the offsets, the
+frequencies, and an open-addressing hash index. It behaves like the dicts
+returned by utils.create_results() (keys are frozensets, values are
+frequencies), but uses an order of magnitude less memory.
+"""
+
+import array, collections.abc
+import utils
+
+
+class ItemMap:
+    """ Map items to dense ids ordered by decreasing item frequency. """
+
+    def __init__(self, item_freqs):
+        """ 'item_freqs' is a dict whose keys are items and values are their
+        frequencies. Ties are broken by item. """
+        self.items = sorted(item_freqs, key=lambda x: (-item_freqs[x], x))
+        self.ids = dict((item, i) for (i, item) in enumerate(self.items))
+        self.typecode = 'H' if len(self.items) <= 1 << 16 else 'I'
+
+    @classmethod
+    def from_itemsets(cls, itemsets):
+        """ Create an ItemMap from a dict whose keys are itemsets and values
+        are frequencies.
+
+        The frequency of an item is the frequency of the corresponding
+        singleton if it is in 'itemsets', otherwise the item comes after all
+        the items whose singletons are."""
+        item_freqs = dict()
+        for itemset in itemsets:
+            if len(itemset) == 1:
+                (item,) = itemset
+                item_freqs[item] = itemsets[itemset]
+        for itemset in itemsets:
+            for item in itemset:
+                if item not in item_freqs:
+                    item_freqs[item] = -1.0
+        return cls(item_freqs)
+
+    @classmethod
+    def from_results(cls, file_name, min_freq):
+        """ Create an ItemMap from the results file file_name, using the
+        singletons with frequency at least min_freq. """
+        item_freqs = dict()
+        for (itemset, freq) in utils.iter_results(file_name, min_freq):
+            if len(itemset) == 1:
+                (item,) = itemset
+                item_freqs[item] = freq
+        return cls(item_freqs)
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item):
+        """ Add a new item with the largest id and return its id. """
+        if item not in self.ids:
+            self.ids[item] = len(self.items)
+            self.items.append(item)
+        return self.ids[item]
+
+    def encode(self, itemset):
+        """ Return the sorted tuple of the ids of the items in 'itemset'.
+
+        Raise KeyError if an item is not in the map."""
+        ids = self.ids
+        return tuple(sorted(ids[item] for item in itemset))
+
+    def decode(self, ids):
+        """ Return the itemset (a frozenset) whose items have the given ids.
+        """
+        items = self.items
+        return frozenset(items[i] for i in ids)
+
+
+class ItemsetStore(collections.abc.Mapping):
+    """ A collection of itemsets and their frequencies, stored in contiguous
+    arrays.
+
+    The itemsets are identified by their index in the store, which is the
+    order in which they were added. Lookups with itemsets (frozensets) go
+    through the ItemMap 'item_map'; the methods ending in '_ids' take encoded
+    itemsets (sorted tuples of ids) directly."""
+
+    def __init__(self, item_map):
+        self.item_map = item_map
+        self._ids = array.array(item_map.typecode)
+        self._offsets = array.array('q', [0])
+        self._freqs = array.array('d')
+        self._hashes = array.array('q')
+        self._table = array.array('q', [-1]) * 8
+        self._mask = 7
+
+    def __len__(self):
+        return len(self._freqs)
+
+    def __iter__(self):
+        for index in range(len(self._freqs)):
+            yield self.get_itemset(index)
+
+    def __contains__(self, itemset):
+        return self.index(itemset) > -1
+
+    def __getitem__(self, itemset):
+        index = self.index(itemset)
+        if index == -1:
+            raise KeyError(itemset)
+        return self._freqs[index]
+
+    def _find(self, ids, ids_hash):
+        """ Return the slot of the hash table for the encoded itemset 'ids'.
+        The slot contains -1 if the itemset is not in the store. """
+        slot = ids_hash & self._mask
+        while True:
+            index = self._table[slot]
+            if index == -1 or (self._hashes[index] == ids_hash and
+                    self.get_ids(index) == ids):
+                return slot
+            slot = (slot + 1) & self._mask
+
+    def _grow(self):
+        """ Double the size of the hash table. """
+        self._table = array.array('q', [-1]) * (2 * len(self._table))
+        self._mask = len(self._table) - 1
+        for index in range(len(self._hashes)):
+            slot = self._hashes[index] & self._mask
+            while self._table[slot] != -1:
+                slot = (slot + 1) & self._mask
+            self._table[slot] = index
+
+    def add_ids(self, ids, freq):
+        """ Add the encoded itemset 'ids' with frequency 'freq', if not
+        already present, and return its index. """
+        ids_hash = hash(ids)
+        slot = self._find(ids, ids_hash)
+        if self._table[slot] > -1:
+            return self._table[slot]
+        index = len(self._freqs)
+        self._table[slot] = index
+        self._ids.extend(ids)
+        self._offsets.append(len(self._ids))
+        self._freqs.append(freq)
+        self._hashes.append(ids_hash)
+        if 2 * len(self._freqs) > len(self._table):
+            self._grow()
+        return index
+
+    def add(self, itemset, freq):
+        """ Add 'itemset' (a frozenset) with frequency 'freq', if not already
+        present, and return its index. New items are added to the map. """
+        item_map = self.item_map
+        ids = tuple(sorted(item_map.add(item) for item in itemset))
+        if self._ids.typecode == 'H' and len(item_map) > 1 << 16:
+            self._ids = array.array('I', self._ids)
+        return self.add_ids(ids, freq)
+
+    def index_ids(self, ids):
+        """ Return the index of the encoded itemset 'ids', or -1 if it is not
+        in the store. """
+        return self._table[self._find(ids, hash(ids))]
+
+    def index(self, itemset):
+        """ Return the index of 'itemset' (a frozenset), or -1 if it is not in
+        the store. """
+        try:
+            ids = self.item_map.encode(itemset)
+        except KeyError:
+            return -1
+        return self.index_ids(ids)
+
+    def count(self, min_freq):
+        """ Return the number of itemsets with frequency at least min_freq.
+
+        The itemsets must have been added from the most frequent to the least
+        frequent, as done by create_store(), so that they are a prefix of the
+        store, whose length is found by binary search."""
+        (low, high) = (0, len(self._freqs))
+        while low < high:
+            middle = (low + high) // 2
+            if self._freqs[middle] >= min_freq:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def prefix(self, min_freq):
+        """ Return a StorePrefix with the itemsets with frequency at least
+        min_freq (see count()). """
+        return StorePrefix(self, self.count(min_freq))
+
+    def get_ids(self, index):
+        """ Return the encoded itemset at position 'index'. """
+        return tuple(self._ids[self._offsets[index]:self._offsets[index + 1]])
+
+    def get_itemset(self, index):
+        """ Return the itemset at position 'index' as a frozenset. """
+        return self.item_map.decode(self._ids[self._offsets[index]:
+            self._offsets[index + 1]])
+
+    def get_freq(self, index):
+        """ Return the frequency of the itemset at position 'index'. """
+        return self._freqs[index]
+
+    def get_len(self, index):
+        """ Return the length of the itemset at position 'index'. """
+        return self._offsets[index + 1] - self._offsets[index]
+
+    def is_subset(self, first_index, second_index):
+        """ Return True if the itemset at first_index is a subset of the
+        itemset at second_index. """
+        if self.get_len(first_index) > self.get_len(second_index):
+            return False
+        return set(self.get_ids(first_index)) <= set(self.get_ids(
+            second_index))
+
+    def union_ids(self, first_index, second_index):
+        """ Return the encoded union of the itemsets at first_index and
+        second_index. The union may not be in the store. """
+        return tuple(sorted(set(self.get_ids(first_index)) |
+            set(self.get_ids(second_index))))
+
+
+class StorePrefix(collections.abc.Mapping):
+    """ A read-only view of the first 'length' itemsets of an ItemsetStore.
+
+    It behaves like the store created with a higher threshold, so a single
+    store, created at the lowest threshold, can be used for many thresholds
+    (see ItemsetStore.prefix())."""
+
+    def __init__(self, store, length):
+        self.store = store
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self.store.get_itemset(index)
+
+    def __contains__(self, itemset):
+        return -1 < self.store.index(itemset) < self.length
+
+    def __getitem__(self, itemset):
+        index = self.store.index(itemset)
+        if index == -1 or index >= self.length:
+            raise KeyError(itemset)
+        return self.store.get_freq(index)
+
+
+def create_store(file_name, min_freq, item_map=None):
+    """ Read the Frequent Itemsets at threshold min_freq from file_name into
+    an ItemsetStore.
+
+    The store contains the same itemsets and frequencies as the dict returned
+    by utils.create_results(file_name, min_freq), in the same order. If
+    item_map is None, a new ItemMap is created from the singletons in the
+    file."""
+    if item_map is None:
+        item_map = ItemMap.from_results(file_name, min_freq)
+    store = ItemsetStore(item_map)
+    for (itemset, freq) in utils.iter_results(file_name, min_freq):
+        store.add(itemset, freq)
+    return store
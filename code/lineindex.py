@@ -0,0 +1,139 @@
+# Finding the True Frequent Itemsets
+#
+# Copyright 2014 Matteo Riondato <matteo@cs.brown.edu> and Fabio Vandin
+# <vandinfa@imada.sdu.dk>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Line-offset index of a dataset, for random access to its transactions.
+
+The index of the dataset 'dataset' is stored in the file 'dataset.idx'. It
+contains the byte offsets of the beginnings of the lines (transactions) of the
+dataset, followed by the size of the dataset, so that the line i is the range
+[offsets[i], offsets[i+1]) of the dataset (including the newline, if any). The
+layout of the file is the following (all values are little-endian):
+    header: MAGIC (8 bytes), size of the dataset in bytes, modification time
+    of the dataset in nanoseconds, number of lines (three int64)
+    offsets (number of lines + 1 uint64)
+An index is only used if the size and the modification time of the dataset
+match the ones in the header.
+
+The index is built by this script, or as a by-product of the computation of
+the stats of the dataset (see getDatasetInfo.compute_ds_stats()). It is used
+by createSample.py, splitDataset.py, and by the parallel scan of the dataset
+(see getDatasetInfo.get_chunks()).
+"""
+
+import os, os.path, struct, sys
+import numpy as np
+import utils
+
+MAGIC = b"TFIIDX01"
+HEADER = struct.Struct("<8sqqq")
+INDEX_SUFFIX = ".idx"
+# Size of the blocks read from the dataset
+BLOCK_SIZE = 1 << 24
+
+
+def get_index_file(dataset):
+    """ Return the name of the index file of 'dataset'. """
+    return dataset + INDEX_SUFFIX
+
+
+def get_block_offsets(block, position):
+    """ Return the offsets of the beginnings of the lines following the
+    newlines in 'block' (bytes), which starts at offset 'position' of the
+    dataset. """
+    buf = np.frombuffer(block, dtype=np.uint8)
+    return np.flatnonzero(buf == 10).astype(np.uint64) + (position + 1)
+
+
+def write(dataset, offsets_blocks, index_file=None):
+    """ Write the index of 'dataset' given the list offsets_blocks of arrays
+    whose concatenation are the offsets of the beginnings of all the lines
+    but the first one (e.g., returned by get_block_offsets()). """
+    if index_file is None:
+        index_file = get_index_file(dataset)
+    stat = os.stat(dataset)
+    offsets = np.concatenate([np.zeros(1, dtype=np.uint64)] +
+                             offsets_blocks).astype('<u8')
+    # The beginning of the line after the last newline is the end of the
+    # dataset, unless the last line has no newline.
+    if offsets[-1] != stat.st_size:
+        offsets = np.concatenate((offsets, np.array([stat.st_size],
+                                                    dtype='<u8')))
+    with open(index_file, 'wb') as FILE:
+        FILE.write(HEADER.pack(MAGIC, stat.st_size, stat.st_mtime_ns,
+                               len(offsets) - 1))
+        FILE.write(offsets.tobytes())
+
+
+def build(dataset, index_file=None):
+    """ Build the index of 'dataset' and write it to index_file (by default,
+    the file returned by get_index_file()). """
+    offsets_blocks = []
+    position = 0
+    with open(dataset, 'rb') as DS:
+        while True:
+            block = DS.read(BLOCK_SIZE)
+            if len(block) == 0:
+                break
+            offsets_blocks.append(get_block_offsets(block, position))
+            position += len(block)
+    write(dataset, offsets_blocks, index_file)
+
+
+def load(dataset, index_file=None):
+    """ Return the offsets (a memory-mapped numpy array) of the lines of
+    'dataset' from its index, or None if the index does not exist or is not
+    valid for the dataset. """
+    if index_file is None:
+        index_file = get_index_file(dataset)
+    if not os.path.isfile(index_file):
+        return None
+    stat = os.stat(dataset)
+    with open(index_file, 'rb') as FILE:
+        header = FILE.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    (magic, size, mtime_ns, lines_num) = HEADER.unpack(header)
+    if magic != MAGIC or size != stat.st_size or \
+            mtime_ns != stat.st_mtime_ns or os.path.getsize(index_file) != \
+            HEADER.size + 8 * (lines_num + 1):
+        return None
+    return np.memmap(index_file, dtype='<u8', mode='r', offset=HEADER.size,
+                     shape=(lines_num + 1, ))
+
+
+def get_line_starts(offsets, positions):
+    """ Return the offsets of the beginnings of the first lines starting at or
+    after each of the byte 'positions', given the 'offsets' of the lines. """
+    return offsets[np.searchsorted(offsets, positions)]
+
+
+def main():
+    # Verify arguments
+    if len(sys.argv) != 2 and len(sys.argv) != 3:
+        utils.error_exit("Usage: {} dataset [index_file]\n".format(os.path.basename(sys.argv[0])))
+    dataset = sys.argv[1]
+    if not os.path.isfile(dataset):
+        utils.error_exit("{} does not exist, or is not a file\n".format(dataset))
+    index_file = sys.argv[2] if len(sys.argv) == 3 else None
+
+    build(dataset, index_file)
+    print(len(load(dataset, index_file)) - 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,27 +18,11 @@
 
 . ./conf.sh
 
-OS=`uname`
-if [ ${OS} = "Linux" ]; then
-    TAC="tac"
-else
-    TAC="tail -r"
-fi
-
 if [ $# -ne 3 ]; then
   echo "Usage: $0 MINSUPP DATASET OUTFILE" >&2
   exit 1
 fi
 
-TMPBASE=`basename $0`
-TMPFILE=`mktemp --tmpdir=${RESULTS_BASE} ${TMPBASE}.XXXXXXXXXX`
-if [ $? -ne 0 ]; then
-  echo "$0: Can't create temp file, exiting..." >&2
-  exit 1
-fi
-
+# Sort the itemsets by decreasing support, in place
 ${SCRIPTS_BASE}/grahne/fim_all $2 $1 $3 && \
-${PYTHON3} ${SCRIPTS_BASE}/externalSort.py -k "int(line[line.index('(')+1:line.index(')')])" -t ${RESULTS_BASE} $3 ${TMPFILE} && \
-${TAC} ${TMPFILE} > $3
-rm ${TMPFILE}
-
+${PYTHON3} ${SCRIPTS_BASE}/sortResults.py -t ${RESULTS_BASE} $3 $3
@@ -0,0 +1,108 @@
+# Finding the True Frequent Itemsets
+#
+# Copyright 2014 Matteo Riondato <matteo@cs.brown.edu> and Fabio Vandin
+# <vandinfa@imada.sdu.dk>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Computation of the part of the negative border used by the VC method.
+
+Given a collection F of frequent itemsets, closed downwards (e.g., all the
+itemsets in a results file with frequency at least some threshold), and a
+collection of maximal itemsets M in F, we want the "siblings" of the maximal
+itemsets: the itemsets (M - {x}) | {y}, for x in M and y a frequent item not in
+M, that are not in F but whose immediate subsets are all in F.
+
+Let R = M - {x}. The immediate subsets of R | {y} are R and (R - {z}) | {y} for
+z in R. If we define the extensions of an itemset S as the items y not in S
+such that S | {y} is in F, then the siblings built from R are R | {y} for the
+items y that are extensions of all the R - {z} but not of R. The extensions are
+computed with a single pass over F, using integer-encoded itemsets (see
+itemsets.py), and only for the itemsets that are needed. Each sibling is then
+obtained from an intersection of sets of ids, without creating and testing all
+its subsets.
+"""
+
+import itemsets
+
+
+def _remove(ids, index):
+    """ Return the encoded itemset 'ids' without the id at position 'index'.
+    """
+    return ids[:index] + ids[index + 1:]
+
+
+def get_negative_border(freq_itemsets, maximal_itemsets):
+    """ Compute the siblings of the maximal itemsets that are in the negative
+    border of freq_itemsets.
+
+    'freq_itemsets' is a collection (a dict, a set, or an ItemsetStore) of
+    frequent itemsets (frozensets), closed downwards. 'maximal_itemsets' is an
+    iterable of itemsets in freq_itemsets. Maximal itemsets of length 1 have
+    no siblings in the negative border, since all their siblings are frequent
+    items.
+
+    Return a set of frozensets."""
+    maximal_itemsets = [x for x in maximal_itemsets if len(x) > 1]
+    if len(maximal_itemsets) == 0:
+        return set()
+
+    if isinstance(freq_itemsets, itemsets.ItemsetStore):
+        item_map = freq_itemsets.item_map
+    else:
+        item_map = itemsets.ItemMap.from_itemsets(
+            dict.fromkeys(freq_itemsets, 1.0))
+
+    # Collect the itemsets R = M - {x} and R - {z}, whose extensions we need.
+    reduced = set()
+    needed = set()
+    for maximal in maximal_itemsets:
+        maximal_ids = item_map.encode(maximal)
+        for index in range(len(maximal_ids)):
+            reduced_ids = _remove(maximal_ids, index)
+            reduced.add(reduced_ids)
+            needed.add(reduced_ids)
+            for sub_index in range(len(reduced_ids)):
+                needed.add(_remove(reduced_ids, sub_index))
+    needed_lengths = frozenset(len(x) + 1 for x in needed)
+
+    # Compute the extensions with a pass over the frequent itemsets.
+    extensions = dict((ids, set()) for ids in needed)
+    encode = item_map.encode
+    for itemset in freq_itemsets:
+        if len(itemset) not in needed_lengths:
+            continue
+        ids = encode(itemset)
+        for index in range(len(ids)):
+            subset = _remove(ids, index)
+            if subset in extensions:
+                extensions[subset].add(ids[index])
+
+    negative_border = set()
+    for reduced_ids in reduced:
+        # Start from the smallest set of extensions, to keep the
+        # intersection small.
+        subsets_extensions = sorted((extensions[_remove(reduced_ids, index)]
+                                     for index in range(len(reduced_ids))),
+                                    key=len)
+        siblings = set(subsets_extensions[0])
+        for subset_extensions in subsets_extensions[1:]:
+            siblings &= subset_extensions
+            if len(siblings) == 0:
+                break
+        siblings -= extensions[reduced_ids]
+        siblings.difference_update(reduced_ids)
+        for item_id in siblings:
+            negative_border.add(item_map.decode(reduced_ids + (item_id, )))
+    return negative_border
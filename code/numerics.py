@@ -0,0 +1,59 @@
+# Finding the True Frequent Itemsets
+#
+# Copyright 2014 Matteo Riondato <matteo@cs.brown.edu> and Fabio Vandin
+# <vandinfa@imada.sdu.dk>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Logarithms of factorials, binomial coefficients, and numbers of itemsets.
+
+The logarithm of n! is lgamma(n + 1), so the logarithms of products of
+consecutive integers and of binomial coefficients take constant time, instead
+of one term per factor. The logarithm of the number of itemsets of size at
+most d built on n items is the logsumexp of the logarithms of the binomial
+coefficients (n choose i) for 1 <= i <= d, which are computed at once with
+scipy.special.gammaln. It is memoized for each pair (n, d), as it is the same
+for all the runs on a dataset.
+"""
+
+import functools, math
+
+
+def log_factorial(m, n):
+    """ Compute the logarithm of m * (m+1) * ... * n (0 if m > n). """
+    if m > n:
+        return 0.0
+    return math.lgamma(n + 1) - math.lgamma(max(m, 1))
+
+
+def log_binomial(n, k):
+    """ Compute the logarithm of n choose k """
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+
+@functools.lru_cache(maxsize=None)
+def get_union_bound_factor(n, d):
+    """ Compute the natural logarithm of the number of itemsets of size at
+    most d built on n items """
+    # NumPy and SciPy are only imported when needed, as they are slow to
+    # import.
+    import numpy as np
+    from scipy.special import gammaln
+    try:
+        from scipy.special import logsumexp as scipy_logsumexp
+    except ImportError:
+        from scipy.misc import logsumexp as scipy_logsumexp
+    sizes = np.arange(1, min(d, n) + 1, dtype=np.float64)
+    return float(scipy_logsumexp(gammaln(n + 1) - gammaln(sizes + 1) -
+                                 gammaln(n - sizes + 1)))
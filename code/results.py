@@ -0,0 +1,274 @@
+# Finding the True Frequent Itemsets
+#
+# Copyright 2014 Matteo Riondato <matteo@cs.brown.edu> and Fabio Vandin
+# <vandinfa@imada.sdu.dk>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Binary columnar format for the results of a mining run.
+
+A binary results file contains the same information as a FIMI text results
+file (see utils.create_results()), stored in three columns that can be
+memory-mapped:
+    'supports': the supports of the itemsets (int64), in reverse sorted order
+    'offsets': the itemset i is items[offsets[i]:offsets[i+1]] (int64)
+    'items': the items of all the itemsets, one after the other (uint32)
+
+The layout of the file is the following (all values are little-endian):
+    header: MAGIC (8 bytes), dataset size, number of itemsets, number of
+    items (three int64)
+    items column, padded to a multiple of 8 bytes
+    supports column
+    offsets column
+
+A text results file can be converted with 'results.py textres binres'.
+
+A results file (in either format) can also be loaded once per process in a
+ResultsIndex with load(): the text files are parsed into the same columns,
+kept in memory. The index is reused by the following calls to load() and by
+the functions reading results files in utils.py, as long as the file does not
+change, so a process using many thresholds (e.g., runSweep.py) parses the
+file only once. The itemsets with frequency in any range are a slice of the
+columns, found by binary search on the supports.
+"""
+
+import array, math, os, os.path, struct, sys
+import numpy as np
+import utils
+
+MAGIC = b"TFIRES01"
+HEADER = struct.Struct("<8sqqq")
+# Number of itemsets converted at once by ResultsIndex.iter_itemsets()
+ITER_CHUNK = 1 << 16
+
+# Map the absolute path of a loaded results file to a triple (size,
+# modification time, ResultsIndex).
+_indexes = dict()
+
+
+def is_binary(file_name):
+    """ Return True if file_name is a binary results file. """
+    with open(file_name, 'rb') as FILE:
+        return FILE.read(len(MAGIC)) == MAGIC
+
+
+def get_min_support(min_freq, size):
+    """ Return the minimum support s such that s / size >= min_freq.
+
+    This is the same comparison used when reading the text results, so the
+    itemsets with support at least the returned value are exactly those with
+    frequency at least min_freq."""
+    min_supp = max(0, int(math.ceil(min_freq * size)))
+    while min_supp > 0 and (min_supp - 1) / size >= min_freq:
+        min_supp -= 1
+    while min_supp / size < min_freq:
+        min_supp += 1
+    return min_supp
+
+
+class ResultsIndex:
+    """ The itemsets of a results file, in reverse sorted order by support.
+
+    The columns are available as the numpy arrays 'supports', 'offsets', and
+    'items' (see the beginning of this file), and 'size' is the size of the
+    dataset. The itemsets with frequency at least a threshold are a prefix of
+    the collection, whose length is found by binary search on 'supports'."""
+
+    def __init__(self, size, supports, offsets, items, file_name=None):
+        self.file_name = file_name
+        self.size = size
+        self.supports = supports
+        self.offsets = offsets
+        self.items = items
+
+    def __len__(self):
+        return len(self.supports)
+
+    def count(self, min_freq):
+        """ Return the number of itemsets with frequency at least min_freq. """
+        min_supp = get_min_support(min_freq, self.size)
+        return len(self.supports) - int(np.searchsorted(self.supports[::-1],
+            min_supp, side='left'))
+
+    def get_slice(self, min_freq, max_freq=None):
+        """ Return the pair (start, end) such that the itemsets at positions
+        start, ..., end - 1 are those with frequency at least min_freq and
+        less than max_freq (no upper limit if max_freq is None). """
+        end = self.count(min_freq)
+        start = 0 if max_freq is None else min(end, self.count(max_freq))
+        return (start, end)
+
+    def get_itemset(self, index):
+        """ Return the itemset at position 'index' as a frozenset. """
+        return frozenset(self.items[self.offsets[index]:
+            self.offsets[index + 1]].tolist())
+
+    def iter_itemsets(self, min_freq, max_freq=None):
+        """ Yield (itemset, frequency) pairs, in order, for all the itemsets
+        with frequency at least min_freq (and less than max_freq, if not
+        None). """
+        (start, end) = self.get_slice(min_freq, max_freq)
+        # The columns are converted to lists in chunks, so that stopping the
+        # iteration early is cheap.
+        for chunk_start in range(start, end, ITER_CHUNK):
+            chunk_end = min(end, chunk_start + ITER_CHUNK)
+            supports = self.supports[chunk_start:chunk_end].tolist()
+            offsets = self.offsets[chunk_start:chunk_end + 1].tolist()
+            items = self.items[offsets[0]:offsets[-1]].tolist()
+            base = offsets[0]
+            for index in range(chunk_end - chunk_start):
+                yield (frozenset(items[offsets[index] - base:
+                                       offsets[index + 1] - base]),
+                       supports[index] / self.size)
+
+
+class BinaryResults(ResultsIndex):
+    """ A memory-mapped binary results file. """
+
+    def __init__(self, file_name):
+        buf = np.memmap(file_name, dtype=np.uint8, mode='r')
+        if len(buf) < HEADER.size:
+            utils.error_exit("{} is not a binary results file\n".format(
+                file_name))
+        (magic, size, itemsets_num, items_num) = HEADER.unpack(
+            bytes(buf[:HEADER.size]))
+        if magic != MAGIC:
+            utils.error_exit("{} is not a binary results file\n".format(
+                file_name))
+        start = HEADER.size
+        end = start + 4 * items_num
+        items = buf[start:end].view('<u4')
+        start = end + (-end % 8)
+        end = start + 8 * itemsets_num
+        supports = buf[start:end].view('<i8')
+        start = end
+        end = start + 8 * (itemsets_num + 1)
+        offsets = buf[start:end].view('<i8')
+        super().__init__(size, supports, offsets, items, file_name)
+
+
+def _iter_text(TEXT):
+    """ Yield the pairs (support, items) of the itemsets in the open text
+    results file TEXT, after the first line, where items is the sorted list
+    of the items. """
+    prev_support = None
+    for line in TEXT:
+        if line.find("(") > -1:
+            tokens = line.split("(")
+            support = int(tokens[1].split(")")[0])
+            if prev_support is not None and support > prev_support:
+                utils.error_exit("Results file must be sorted\n")
+            prev_support = support
+            yield (support, sorted(frozenset(map(int, tokens[0].split()))))
+
+
+def read_text(file_name):
+    """ Parse the text results file file_name into a ResultsIndex. """
+    supports = array.array('q')
+    offsets = array.array('q', [0])
+    items = array.array('I')
+    with open(file_name, 'rt') as TEXT:
+        size = utils.parse_size_line(TEXT.readline())
+        for (support, itemset) in _iter_text(TEXT):
+            items.extend(itemset)
+            supports.append(support)
+            offsets.append(len(items))
+    return ResultsIndex(size, np.frombuffer(supports, dtype=np.int64),
+                        np.frombuffer(offsets, dtype=np.int64),
+                        np.frombuffer(items, dtype=np.uint32), file_name)
+
+
+def load(file_name):
+    """ Return the ResultsIndex of the results file file_name (in either
+    format), reusing the one created by a previous call if the file did not
+    change. """
+    index = get_loaded(file_name)
+    if index is None:
+        path = os.path.abspath(file_name)
+        stat = os.stat(path)
+        index = read_text(file_name)
+        _indexes[path] = (stat.st_size, stat.st_mtime_ns, index)
+    return index
+
+
+def get_loaded(file_name):
+    """ Return the ResultsIndex of file_name if it was loaded with load() and
+    did not change since, or if it is a binary results file (which is
+    memory-mapped). Otherwise return None. """
+    path = os.path.abspath(file_name)
+    stat = os.stat(path)
+    if path in _indexes:
+        (size, mtime_ns, index) = _indexes[path]
+        if size == stat.st_size and mtime_ns == stat.st_mtime_ns:
+            return index
+        del _indexes[path]
+    if not is_binary(file_name):
+        return None
+    index = BinaryResults(file_name)
+    _indexes[path] = (stat.st_size, stat.st_mtime_ns, index)
+    return index
+
+
+def _write_array(FILE, arr):
+    """ Write the array.array 'arr' to FILE in little-endian order. """
+    if sys.byteorder == "big":
+        arr = array.array(arr.typecode, arr)
+        arr.byteswap()
+    FILE.write(arr.tobytes())
+
+
+def convert(text_file_name, bin_file_name):
+    """ Convert the text results file text_file_name to a binary results file
+    bin_file_name.
+
+    The text file must have the format described in utils.create_results().
+    The items are written out while reading, so only the supports and the
+    offsets are kept in memory."""
+    supports = array.array('q')
+    offsets = array.array('q', [0])
+    items_buffer = array.array('I')
+    items_num = 0
+    with open(text_file_name, 'rt') as TEXT, open(bin_file_name, 'wb') as BIN:
+        size = utils.parse_size_line(TEXT.readline())
+        BIN.write(HEADER.pack(MAGIC, size, 0, 0))
+        for (support, itemset) in _iter_text(TEXT):
+            items_buffer.extend(itemset)
+            items_num += len(itemset)
+            supports.append(support)
+            offsets.append(items_num)
+            if len(items_buffer) >= 1 << 20:
+                _write_array(BIN, items_buffer)
+                del items_buffer[:]
+        _write_array(BIN, items_buffer)
+        BIN.write(b"\0" * (-(4 * items_num) % 8))
+        _write_array(BIN, supports)
+        _write_array(BIN, offsets)
+        BIN.seek(0)
+        BIN.write(HEADER.pack(MAGIC, size, len(supports), items_num))
+    return len(supports)
+
+
+def main():
+    if len(sys.argv) != 3:
+        utils.error_exit("Usage: {} textres binres\n".format(
+            os.path.basename(sys.argv[0])))
+    if not os.path.isfile(sys.argv[1]):
+        utils.error_exit("{} does not exist, or is not a file\n".format(
+            sys.argv[1]))
+    itemsets_num = convert(sys.argv[1], sys.argv[2])
+    sys.stderr.write("Converted {} itemsets\n".format(itemsets_num))
+
+
+if __name__ == "__main__":
+    main()
@@ -42,6 +42,12 @@ fi
 
 DATASET_BASE=`echo ${DATASET} | rev | cut -d "." -f 2- | rev`
 
+# The epsilon of the first step of the VC methods does not depend on the
+# frequency, so it is looked up once (see epsilon.py) and passed to the scripts.
+if [ ${ALGO} = "holdoutvc" -o ${ALGO} = "holdoutvcbinom" -o ${ALGO} = "vc" ]; then
+	FIRST_EPSILON=`${PYTHON3} ${SCRIPTS_BASE}/epsilon.py -l ${USE_ADDIT_KNOWL} 0.${DELTA} ${DATASET} | tail -1 | cut -f 1`
+fi
+
 for FREQ in `echo ${FREQS}`; do
 	echo $FREQ
 	RES_BASE="${DATASET_BASE}_d${DELTA}_t${FREQ}_${ALGO}"
@@ -54,14 +60,14 @@ for FREQ in `echo ${FREQS}`; do
         sh ${SCRIPTS_BASE}/getTrueFIsHoldout.sh ${DO_FILTER} ${DELTA} ${FREQ} ${MODE} ${DATASET} > ${TFIS_BASE}/${RES_BASE}.res 2> ${LOGS_BASE}/${RES_BASE}_mine.log
 		EPSILON=`grep "epsilon=" ${LOGS_BASE}/${RES_BASE}_mine.log | tail -1 | cut -d "," -f 3 | cut -d "=" -f 2`
 	elif [ ${ALGO} = "holdoutvc" ]; then
-        sh ${SCRIPTS_BASE}/getTrueFIsHoldoutVC.sh ${USE_ADDIT_KNOWL} ${DELTA} ${FREQ} ${GAP} ${DATASET} > ${TFIS_BASE}/${RES_BASE}.res 2> ${LOGS_BASE}/${RES_BASE}_mine.log
+        sh ${SCRIPTS_BASE}/getTrueFIsHoldoutVC.sh ${USE_ADDIT_KNOWL} ${DELTA} ${FREQ} ${GAP} ${DATASET} ${FIRST_EPSILON} > ${TFIS_BASE}/${RES_BASE}.res 2> ${LOGS_BASE}/${RES_BASE}_mine.log
         EPSILON=`grep "e2=" ${LOGS_BASE}/${RES_BASE}_mine.log | tail -1 | cut -d "," -f 2 |cut -d "=" -f 2`
     elif [ ${ALGO} = "holdoutvcbinom" ]; then
-        sh ${SCRIPTS_BASE}/getTrueFIsHoldoutVCBinom.sh ${USE_ADDIT_KNOWL} ${DELTA} ${FREQ} ${MODE} ${DATASET} > ${TFIS_BASE}/${RES_BASE}.res 2> ${LOGS_BASE}/${RES_BASE}_mine.log
+        sh ${SCRIPTS_BASE}/getTrueFIsHoldoutVCBinom.sh ${USE_ADDIT_KNOWL} ${DELTA} ${FREQ} ${MODE} ${DATASET} ${FIRST_EPSILON} > ${TFIS_BASE}/${RES_BASE}.res 2> ${LOGS_BASE}/${RES_BASE}_mine.log
         EPSILON=`grep "epsilon=" ${LOGS_BASE}/${RES_BASE}_mine.log | tail -1 | cut -d "," -f 3 |cut -d "=" -f 2`
 
     elif [ ${ALGO} = "vc" ]; then
-        sh ${SCRIPTS_BASE}/getTrueFIsVC.sh ${USE_ADDIT_KNOWL} ${DELTA} ${FREQ} ${GAP} ${DATASET} > ${TFIS_BASE}/${RES_BASE}.res 2> ${LOGS_BASE}/${RES_BASE}_mine.log
+        sh ${SCRIPTS_BASE}/getTrueFIsVC.sh ${USE_ADDIT_KNOWL} ${DELTA} ${FREQ} ${GAP} ${DATASET} ${FIRST_EPSILON} > ${TFIS_BASE}/${RES_BASE}.res 2> ${LOGS_BASE}/${RES_BASE}_mine.log
         EPSILON=`grep "e2=" ${LOGS_BASE}/${RES_BASE}_mine.log | tail -1 | cut -d "," -f 4 |cut -d "=" -f 2`
     else # unreached
         echo "You should not be here!" >&2
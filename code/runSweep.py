@@ -0,0 +1,500 @@
+# Finding the True Frequent Itemsets
+#
+# Copyright 2014 Matteo Riondato <matteo@cs.brown.edu> and Fabio Vandin
+# <vandinfa@imada.sdu.dk>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Run the experiments for all the frequencies of a variables file in a single
+process.
+
+This does the same as runExperiment.sh (and the getTrueFIs*.sh scripts it
+calls), but the dataset stats, the mined results, and the original results
+(ORIG_RES) are loaded once and reused for all the frequencies, and the
+statistics of each run are returned as a record (a dict) instead of being
+extracted from the logs.
+
+The configuration file (by default ./conf.sh) and the variables file (e.g.,
+chess_exp.sh) are the ones used by runExperiment.sh. The frequencies are
+processed in increasing order, so the results mined for the first one can be
+used for all the others. The mined results are converted once to the binary
+format (see results.py). For each frequency, the TFIs are written to
+TFIS_BASE, as done by runExperiment.sh, and the records of all the frequencies
+are written to the CSV file LOGS_BASE/<dataset>_d<DELTA>_<algo>_sweep.csv.
+"""
+
+import csv, math, os, os.path, re, subprocess, sys, traceback
+import compareFIs, epsilon, getDatasetInfo, getTrueFIsBinom, \
+    getTrueFIsHoldout, getTrueFIsHoldoutVC, getTrueFIsHoldoutVCBinom, \
+    getTrueFIsVC, itemsets, results, splitDataset, utils
+
+ALGOS = ("binom", "holdout", "holdoutvc", "holdoutvcbinom", "vc")
+# The suffixes of the parts of the dataset used by the holdout methods
+PARTS = ("_expl", "_eval")
+# Number of decimal digits used in the names of the results files
+FREQ_DIGITS = 10
+
+
+def read_vars(file_name):
+    """ Return a dict with the variables assigned in the shell file file_name.
+
+    Only lines of the form NAME=value or NAME="value" are considered. The
+    references ${NAME} to variables assigned before are expanded."""
+    variables = dict()
+    with open(file_name, "rt") as FILE:
+        for line in FILE:
+            match = re.match(r"\s*([A-Za-z_][A-Za-z0-9_]*)=(.*)$", line)
+            if match is None:
+                continue
+            value = match.group(2).strip()
+            if len(value) > 1 and value[0] == value[-1] and value[0] in "\"'":
+                value = value[1:-1]
+            variables[match.group(1)] = re.sub(
+                r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}",
+                lambda x: variables.get(x.group(1), ""), value)
+    return variables
+
+
+def get_freq(digits):
+    """ Return the frequency whose decimal part is the string 'digits', as in
+    the variables files and in the names of the results files. """
+    return float("0." + digits)
+
+
+def get_freq_digits(freq):
+    """ Return the decimal part of the frequency freq, rounded up to
+    FREQ_DIGITS digits. """
+    return "{:0{}d}".format(math.ceil(freq * 10 ** FREQ_DIGITS),
+                            FREQ_DIGITS).rstrip("0") or "0"
+
+
+class Sweep:
+    """ The state shared by the runs of the experiments on a dataset. """
+
+    def __init__(self, conf, exp_vars, conf_dir="."):
+        """ 'conf' and 'exp_vars' are the dicts of the variables of the
+        configuration file and of the variables file (see read_vars()).
+        'conf_dir' is the directory containing the configuration file. """
+        self.conf = conf
+        self.exp_vars = exp_vars
+        self.conf_dir = conf_dir
+        for name in ("DATASET", "ORIG_RES", "GAP", "DELTA", "FREQS",
+                     "USE_ADDIT_KNOWL", "MODE", "DO_FILTER"):
+            if name not in exp_vars:
+                utils.error_exit("{} not set in the variables file\n".format(
+                    name))
+        for name in ("SCRIPTS_BASE", "RESULTS_BASE", "TFIS_BASE",
+                     "SAMPLES_BASE", "LOGS_BASE"):
+            if name not in conf:
+                utils.error_exit(
+                    "{} not set in the configuration file\n".format(name))
+        self.dataset = exp_vars['DATASET']
+        self.base_name = os.path.splitext(os.path.basename(self.dataset))[0]
+        if os.path.isfile(self.dataset):
+            self.ds_file = self.dataset
+        else:
+            self.ds_file = os.path.join(conf['SAMPLES_BASE'], self.dataset)
+        self.ds_stats = getDatasetInfo.get_ds_stats(self.dataset)
+        self.delta = get_freq(exp_vars['DELTA'])
+        self.gap = get_freq(exp_vars['GAP'])
+        self.use_additional_knowledge = int(exp_vars['USE_ADDIT_KNOWL'])
+        self.pvalue_mode = exp_vars['MODE'].upper()
+        self.freqs = sorted(exp_vars['FREQS'].split(), key=get_freq)
+        # Map the suffix of the mined results ("", "_expl", or "_eval") to a
+        # pair (threshold, binary results file).
+        self.results = dict()
+        # The original results, and the threshold at which they were loaded.
+        self.orig_res = None
+        self.orig_res_freq = None
+
+    def get_first_epsilon(self):
+        """ Return the epsilon computed by epsilon.py with the lowered delta,
+        as done by the shell scripts. """
+        (eps_vc_dim, eps_shatter, returned) = epsilon.get_epsilons(
+            epsilon.get_lower_delta(self.delta), self.dataset,
+            self.use_additional_knowledge, self.ds_stats)
+        return min(eps_vc_dim, eps_shatter)
+
+    def find_results(self, suffix, min_freq):
+        """ Return the results file in RESULTS_BASE for the dataset (or its
+        part 'suffix') with the highest threshold not larger than min_freq,
+        and its threshold. Return (None, None) if there is no such file."""
+        pattern = re.compile("{}_t([0-9]+){}\\.res$".format(
+            re.escape(self.base_name), re.escape(suffix)))
+        (found, found_freq) = (None, None)
+        try:
+            file_names = os.listdir(self.conf['RESULTS_BASE'])
+        except OSError:
+            return (None, None)
+        for file_name in file_names:
+            match = pattern.match(file_name)
+            if match is None:
+                continue
+            freq = get_freq(match.group(1))
+            if freq <= min_freq and (found is None or freq > found_freq):
+                (found, found_freq) = (file_name, freq)
+        if found is None:
+            return (None, None)
+        return (os.path.join(self.conf['RESULTS_BASE'], found), found_freq)
+
+    def mine(self, dataset, dataset_size, min_freq, res_file):
+        """ Mine the dataset at frequency min_freq with minedb-gra.sh. """
+        supp = int(math.floor(dataset_size * min_freq))
+        sys.stderr.write("Mining {} with supp={}...".format(dataset, supp))
+        sys.stderr.flush()
+        subprocess.check_call(
+            ["sh", os.path.join(self.conf['SCRIPTS_BASE'], "minedb-gra.sh"),
+             str(supp), dataset, res_file], cwd=self.conf_dir,
+            stdout=subprocess.DEVNULL)
+        sys.stderr.write("done\n")
+        sys.stderr.flush()
+
+    def get_mined_file(self, suffix, min_freq):
+        """ Return the name of the results file of the dataset (or of its
+        part 'suffix') mined at frequency min_freq. """
+        # The name of the file has the frequency rounded up, but the results
+        # contain all the itemsets with frequency at least min_freq.
+        return os.path.join(self.conf['RESULTS_BASE'], "{}_t{}{}.res".format(
+            self.base_name, get_freq_digits(min_freq), suffix))
+
+    def has_results(self, suffix, min_freq):
+        """ Return True if the results of the dataset (or of its part
+        'suffix') with frequency at least min_freq do not need to be mined.
+        """
+        return (suffix in self.results and self.results[suffix][0] <=
+                min_freq) or self.find_results(suffix, min_freq)[0] is not None
+
+    def get_results(self, suffix, min_freq):
+        """ Return the binary results file with the itemsets of the dataset
+        (or of its part 'suffix') with frequency at least min_freq.
+
+        The results are mined only if there are no results in RESULTS_BASE
+        for a threshold not larger than min_freq. They are converted to the
+        binary format if needed, and loaded with results.load(), so that
+        the itemsets for any threshold are found by binary search."""
+        if suffix in self.results and self.results[suffix][0] <= min_freq:
+            return self.results[suffix][1]
+        (res_file, res_freq) = self.find_results(suffix, min_freq)
+        if res_file is None:
+            res_freq = min_freq
+            res_file = self.get_mined_file(suffix, min_freq)
+            if suffix == "":
+                self.mine(self.ds_file, self.ds_stats['size'], min_freq,
+                          res_file)
+            else:
+                self.mine(self.get_part(suffix), self.ds_stats['size'] / 2.0,
+                          min_freq, res_file)
+        return self.load_results(suffix, res_file, res_freq)
+
+    def get_parts_results(self, min_freq):
+        """ Return the pair of binary results files of the parts "_expl" and
+        "_eval" of the dataset with frequency at least min_freq (see
+        get_results()). If both parts must be mined, they are mined in
+        parallel. """
+        if not self.has_results("_expl", min_freq) and \
+                not self.has_results("_eval", min_freq):
+            parts = [self.get_part(x) for x in PARTS]
+            res_files = [self.get_mined_file(x, min_freq) for x in PARTS]
+            sys.stderr.write("Mining {} in parallel...".format(
+                " and ".join(parts)))
+            sys.stderr.flush()
+            splitDataset.mine_parts(parts, [self.ds_stats['size'] / 2.0] * 2,
+                                    min_freq, res_files, cwd=self.conf_dir)
+            sys.stderr.write("done\n")
+            sys.stderr.flush()
+            for (suffix, res_file) in zip(PARTS, res_files):
+                self.load_results(suffix, res_file, min_freq)
+        return tuple(self.get_results(x, min_freq) for x in PARTS)
+
+    def load_results(self, suffix, res_file, res_freq):
+        """ Convert the results file res_file of the dataset (or of its part
+        'suffix'), containing the itemsets with frequency at least res_freq,
+        to the binary format if needed, and load it. Return the binary
+        file. """
+        bin_file = os.path.splitext(res_file)[0] + ".bin"
+        if not os.path.isfile(bin_file) or \
+                os.path.getmtime(bin_file) < os.path.getmtime(res_file):
+            sys.stderr.write("Converting {}...".format(res_file))
+            sys.stderr.flush()
+            results.convert(res_file, bin_file)
+            sys.stderr.write("done\n")
+            sys.stderr.flush()
+        # Keep the index of the results for the following runs.
+        results.load(bin_file)
+        self.results[suffix] = (res_freq, bin_file)
+        return bin_file
+
+    def get_part(self, suffix):
+        """ Return the part 'suffix' ("_expl" or "_eval") of the dataset,
+        splitting the dataset if needed. """
+        expl = os.path.join(self.conf['SAMPLES_BASE'], "{}_expl.dat".format(
+            self.base_name))
+        eval = os.path.join(self.conf['SAMPLES_BASE'], "{}_eval.dat".format(
+            self.base_name))
+        if not os.path.isfile(expl) or not os.path.isfile(eval):
+            sys.stderr.write("Splitting the dataset...")
+            sys.stderr.flush()
+            splitDataset.split_dataset(self.ds_stats['size'], self.ds_file,
+                                       expl, eval)
+            sys.stderr.write("done\n")
+            sys.stderr.flush()
+        return expl if suffix == "_expl" else eval
+
+    def get_orig_res(self, min_freq):
+        """ Return the original results with frequency at least min_freq.
+
+        The original results are loaded once in an ItemsetStore, and a view
+        of the store is returned (see itemsets.StorePrefix)."""
+        if self.orig_res is None or self.orig_res_freq > min_freq:
+            sys.stderr.write("Loading original results...")
+            sys.stderr.flush()
+            self.orig_res = itemsets.create_store(
+                os.path.expanduser(self.exp_vars['ORIG_RES']), min_freq)
+            self.orig_res_freq = min_freq
+            sys.stderr.write("done\n")
+            sys.stderr.flush()
+        return self.orig_res.prefix(min_freq)
+
+    def run_binom(self, min_freq):
+        """ Run getTrueFIsBinom and return the triple (trueFIs, ds_size,
+        record). """
+        res_file = self.get_results("", min_freq)
+        (trueFIs, stats) = getTrueFIsBinom.get_trueFIs(
+            self.ds_stats, res_file, min_freq, self.delta, self.pvalue_mode,
+            self.use_additional_knowledge)
+        record = {'res_file': os.path.basename(res_file),
+                  'add_knowl': self.use_additional_knowledge,
+                  'pvalue_mode': self.pvalue_mode, 'delta': self.delta,
+                  'min_freq': min_freq, 'trueFIs': len(trueFIs),
+                  'union_bound_factor': stats['union_bound_factor'],
+                  'critical_value': stats['critical_value'],
+                  'removed': stats['removed'], 'epsilon': stats['epsilon']}
+        return (trueFIs, self.ds_stats['size'], record)
+
+    def run_holdout(self, min_freq):
+        """ Run getTrueFIsHoldout and return the triple (trueFIs, ds_size,
+        record). """
+        (exp_res_file, eval_res_file) = self.get_parts_results(min_freq)
+        do_filter = int(self.exp_vars['DO_FILTER'])
+        if do_filter == 1:
+            do_filter = self.ds_stats['numitems']
+        (trueFIs, stats) = getTrueFIsHoldout.get_trueFIs(
+            exp_res_file, eval_res_file, min_freq, self.delta,
+            self.pvalue_mode, do_filter)
+        record = {'exp_res_file': os.path.basename(exp_res_file),
+                  'eval_res_file': os.path.basename(eval_res_file),
+                  'do_filter': do_filter, 'pvalue_mode': self.pvalue_mode,
+                  'delta': self.delta, 'min_freq': min_freq,
+                  'trueFIs': len(trueFIs)}
+        for key in ('orig_size', 'exp_size', 'eval_size', 'exp_res',
+                    'exp_res_filtered', 'eval_res', 'filter_critical_value',
+                    'filter_epsilon', 'tfis_from_exp', 'holdout_intersection',
+                    'holdout_false_negatives', 'critical_value', 'removed',
+                    'epsilon'):
+            record[key] = stats[key]
+        return (trueFIs, stats['orig_size'], record)
+
+    def run_holdoutvc(self, min_freq):
+        """ Run getTrueFIsHoldoutVC and return the triple (trueFIs, ds_size,
+        record). """
+        (exp_res_file, eval_res_file) = self.get_parts_results(min_freq)
+        first_epsilon = self.get_first_epsilon() * math.sqrt(2)
+        if self.use_additional_knowledge:
+            vcdim = min(2 * self.ds_stats['maxlen'],
+                        self.ds_stats['numitems'] - 1)
+        else:
+            vcdim = -1
+        eval_stats = getDatasetInfo.get_ds_stats(self.get_part("_eval"))
+        (trueFIs, stats) = getTrueFIsHoldoutVC.get_trueFIs(
+            eval_stats, exp_res_file, eval_res_file, min_freq, self.delta,
+            self.gap, first_epsilon, vcdim)
+        record = {'exp_res_file': os.path.basename(exp_res_file),
+                  'eval_res_file': os.path.basename(eval_res_file),
+                  'delta': self.delta, 'min_freq': min_freq,
+                  'trueFIs': len(trueFIs)}
+        for key in ('orig_size', 'exp_size', 'eval_size', 'exp_res',
+                    'eval_res', 'holdout_intersection',
+                    'holdout_false_positives', 'holdout_false_negatives',
+                    'holdout_jaccard'):
+            record[key] = stats[key]
+        record['e1'] = stats['epsilon_1']
+        record['e2'] = stats['epsilon_2']
+        record['vcdim'] = stats['vcdim']
+        record['epsilon'] = stats['epsilon_2']
+        return (trueFIs, stats['orig_size'], record)
+
+    def run_holdoutvcbinom(self, min_freq):
+        """ Run getTrueFIsHoldoutVCBinom and return the triple (trueFIs,
+        ds_size, record). """
+        (exp_res_file, eval_res_file) = self.get_parts_results(min_freq)
+        first_epsilon = self.get_first_epsilon() * math.sqrt(2)
+        (trueFIs, stats) = getTrueFIsHoldoutVCBinom.get_trueFIs(
+            exp_res_file, eval_res_file, min_freq, self.delta,
+            self.pvalue_mode, first_epsilon)
+        record = {'exp_res_file': os.path.basename(exp_res_file),
+                  'eval_res_file': os.path.basename(eval_res_file),
+                  'pvalue_mode': self.pvalue_mode, 'delta': self.delta,
+                  'min_freq': min_freq, 'trueFIs': len(trueFIs)}
+        for key in ('orig_size', 'exp_size', 'eval_size', 'exp_res',
+                    'exp_res_filtered', 'eval_res', 'filter_epsilon',
+                    'tfis_from_exp', 'holdout_intersection',
+                    'holdout_false_negatives', 'critical_value', 'removed',
+                    'epsilon'):
+            record[key] = stats[key]
+        return (trueFIs, stats['orig_size'], record)
+
+    def run_vc(self, min_freq):
+        """ Run getTrueFIsVC and return the triple (trueFIs, ds_size, record),
+        or None if the results cannot be mined at the needed frequency. """
+        first_epsilon = self.get_first_epsilon()
+        lower_supp = int(math.floor(self.ds_stats['size'] *
+                                    (min_freq - first_epsilon)))
+        if lower_supp <= 0:
+            sys.stderr.write(
+                " ".join(
+                    ("LOWER_SUPP={} less than 0.".format(lower_supp),
+                     "USE_ADDIT_KNOWL={}".format(
+                         self.use_additional_knowledge),
+                     "MIN_FREQ={}".format(min_freq),
+                     "EPSILON={}".format(first_epsilon),
+                     "DELTA={}\n".format(self.delta))))
+            return None
+        res_file = self.get_results("", min_freq - first_epsilon)
+        (trueFIs, stats) = getTrueFIsVC.get_trueFIs(
+            self.ds_stats, res_file, min_freq, self.delta, self.gap,
+            self.use_additional_knowledge)
+        record = {'res_file': os.path.basename(res_file),
+                  'add_knowl': self.use_additional_knowledge,
+                  'e1': stats['epsilon_1'], 'e2': stats['epsilon_2'],
+                  'delta': self.delta, 'min_freq': min_freq,
+                  'trueFIs': len(trueFIs), 'base_set': stats['base_set'],
+                  'maximal_itemsets': stats['maximal_itemsets'],
+                  'negative_border': stats['negative_border'],
+                  'emp_vc_dim': stats['emp_vc_dim'],
+                  'not_emp_vc_dim': stats['not_emp_vc_dim'],
+                  'epsilon': stats['epsilon_2']}
+        return (trueFIs, self.ds_stats['size'], record)
+
+    def run(self, algo, freq_digits):
+        """ Run the algorithm 'algo' at the frequency with decimal part
+        freq_digits, write the TFIs to TFIS_BASE, and compare them with the
+        original results.
+
+        Return the record of the run, i.e., the dict with the statistics
+        computed by the algorithm and by compareFIs.compare(), or None if the
+        algorithm could not be run."""
+        min_freq = get_freq(freq_digits)
+        sys.stderr.write("{} min_freq={}\n".format(algo, min_freq))
+        sys.stderr.flush()
+        ran = getattr(self, "run_" + algo)(min_freq)
+        if ran is None:
+            return None
+        (trueFIs, ds_size, record) = ran
+
+        tfis_file = os.path.join(self.conf['TFIS_BASE'], "{}_d{}_t{}_{}.res"
+                                 .format(self.base_name,
+                                         self.exp_vars['DELTA'], freq_digits,
+                                         algo))
+        with open(tfis_file, "wt") as FILE:
+            utils.print_itemsets(trueFIs, ds_size, FILE)
+
+        sample_res = dict((itemset, trueFIs[itemset]) for itemset in trueFIs
+                          if trueFIs[itemset] >= min_freq)
+        orig_res = self.get_orig_res(min_freq)
+        stats = compareFIs.compare(orig_res, sample_res, record['epsilon'])
+        record['orig_res'] = os.path.basename(self.exp_vars['ORIG_RES'])
+        record['sample_res'] = os.path.basename(tfis_file)
+        record['origFIs'] = len(orig_res)
+        record['intersect'] = stats['intersection']
+        record['false_neg'] = stats['false_negatives']
+        record['false_pos'] = stats['false_positives']
+        record['jaccard'] = stats['jaccard']
+        record['wrong_eps'] = stats['wrong_eps']
+        record['max_abs_err'] = stats['max_absolute_error']
+        record['avg_abs_err'] = stats['avg_absolute_error']
+        record['avg_rel_err'] = stats['avg_relative_error']
+        return record
+
+    def run_all(self, algo):
+        """ Run the algorithm 'algo' for all the frequencies, in increasing
+        order, and return the list of the records. """
+        records = []
+        for freq_digits in self.freqs:
+            record = self.run(algo, freq_digits)
+            if record is not None:
+                records.append(record)
+        return records
+
+
+def write_records(records, file_name):
+    """ Write the records (dicts with the same keys) to the CSV file
+    file_name. """
+    with open(file_name, "wt", newline="") as FILE:
+        if len(records) == 0:
+            return
+        writer = csv.DictWriter(FILE, fieldnames=list(records[0].keys()))
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def main():
+    if len(sys.argv) != 3 and len(sys.argv) != 4:
+        utils.error_exit(
+            " ".join(
+                ("Usage: {}".format(os.path.basename(sys.argv[0])),
+                 "{{binom|holdout|holdoutvc|holdoutvcbinom|vc|all}}[,...]",
+                 "var_file [conf_file]\n")))
+    algos = sys.argv[1].split(",")
+    if "all" in algos:
+        algos = list(ALGOS)
+    for algo in algos:
+        if algo not in ALGOS:
+            utils.error_exit(
+                " ".join(
+                    ("Algorithm '{}' not recognized.".format(algo),
+                     "Must be binom, holdout, holdoutvc, holdoutvcbinom,",
+                     "vc, or all\n")))
+    conf_file = sys.argv[3] if len(sys.argv) == 4 else "conf.sh"
+    for file_name in (sys.argv[2], conf_file):
+        if not os.path.isfile(file_name):
+            utils.error_exit("{} does not exist, or is not a file\n".format(
+                file_name))
+
+    sweep = Sweep(read_vars(conf_file), read_vars(sys.argv[2]),
+                  os.path.dirname(os.path.abspath(conf_file)))
+    # A failing algorithm is reported, and the sweep goes on with the others.
+    # The scripts exit with utils.error_exit() on errors, which raises
+    # SystemExit, so it is caught too.
+    failed = []
+    for algo in algos:
+        try:
+            records = sweep.run_all(algo)
+        except (Exception, SystemExit):
+            sys.stderr.write("{}: failed\n{}".format(algo,
+                                                    traceback.format_exc()))
+            failed.append(algo)
+            continue
+        csv_file = os.path.join(sweep.conf['LOGS_BASE'],
+                                "{}_d{}_{}_sweep.csv".format(
+                                    sweep.base_name, sweep.exp_vars['DELTA'],
+                                    algo))
+        write_records(records, csv_file)
+        sys.stderr.write("{}: {} records written to {}\n".format(
+            algo, len(records), csv_file))
+    if len(failed) > 0:
+        utils.error_exit("Failed algorithms: {}\n".format(",".join(failed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# Finding the True Frequent Itemsets
+#
+# Copyright 2014 Matteo Riondato <matteo@cs.brown.edu> and Fabio Vandin
+# <vandinfa@imada.sdu.dk>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Sort the output of the miner by decreasing support.
+
+Each line of the output of the miner is an itemset followed by its support
+between parentheses, e.g., "1 3 7 (42)". The file is sorted by an external
+merge sort:
+    1. The file is split in runs of complete lines, which fit in the memory
+    budget. The runs are sorted by worker processes: the supports are parsed
+    once with numpy, and the lines are sorted by decreasing support. A sorted
+    run is a sequence of segments of lines with the same support, so it is
+    described by the supports of the segments and their lengths in bytes.
+    2. The sorted runs are merged by copying, for each support in decreasing
+    order, the segments with that support of all the runs, in the order of
+    the runs. The lines are never parsed again.
+Lines with the same support keep their order in the input. If the whole file
+is one run, it is sorted in memory.
+"""
+
+import heapq, os, os.path, shutil, sys, tempfile
+import getDatasetInfo, utils
+
+# Default memory budget (in bytes) for the runs being sorted at the same time
+MEMORY = 1 << 28
+# Memory used to sort a run, as a multiple of its size
+RUN_MEMORY_FACTOR = 8
+# Size of the blocks copied from the runs to the output
+BLOCK_SIZE = 1 << 20
+# Largest number of digits of a support
+MAX_SUPPORT_DIGITS = 18
+
+
+def parse_supports(buf, starts, ends):
+    """ Return the supports (numpy array) of the lines of a block, given its
+    bytes 'buf' (numpy uint8 array) and the offsets of the beginnings and of
+    the ends of its lines. Raise ValueError if a line is malformed (the
+    blocks are sorted by worker processes, which must not exit). """
+    import numpy as np
+    opens = np.flatnonzero(buf == ord("("))
+    closes = np.flatnonzero(buf == ord(")"))
+    if len(opens) != len(starts) or len(closes) != len(starts) or \
+            np.any(opens < starts) or np.any(closes >= ends) or \
+            np.any(closes - opens < 2) or np.any(closes - opens - 1 >
+                                                 MAX_SUPPORT_DIGITS):
+        raise ValueError("Malformed line in the results")
+    digits_nums = closes - opens - 1
+    supports = np.zeros(len(starts), dtype=np.int64)
+    for digit in range(int(digits_nums.max()) if len(starts) > 0 else 0):
+        has_digit = digits_nums > digit
+        values = buf[closes[has_digit] - 1 - digit].astype(np.int64) - \
+            ord("0")
+        if np.any(values < 0) or np.any(values > 9):
+            raise ValueError("Malformed support in the results")
+        supports[has_digit] += values * (10 ** digit)
+    return supports
+
+
+def sort_block(block):
+    """ Sort the lines of 'block' (bytes of complete lines) by decreasing
+    support, keeping the order of 'block' for the same support.
+
+    Return a pair (sorted_block, segments), where segments is a list of pairs
+    (support, length) with the supports of the segments of sorted_block with
+    the same support, and their lengths in bytes."""
+    import numpy as np
+    if block[-1:] != b"\n":
+        block += b"\n"
+    buf = np.frombuffer(block, dtype=np.uint8)
+    ends = np.flatnonzero(buf == 10) + 1
+    starts = np.concatenate(([0], ends[:-1]))
+    supports = parse_supports(buf, starts, ends)
+    order = np.argsort(-supports, kind="stable")
+    lines = block.splitlines(True)
+    sorted_block = b"".join([lines[x] for x in order.tolist()])
+    supports = supports[order]
+    segment_starts = np.flatnonzero(np.concatenate(
+        ([True], supports[1:] != supports[:-1])))
+    lengths = np.add.reduceat((ends - starts)[order], segment_starts)
+    return (sorted_block, list(zip(supports[segment_starts].tolist(),
+                                   lengths.tolist())))
+
+
+def sort_run(input, start, end, run_dir):
+    """ Sort the lines in the byte range [start, end) of the file 'input' and
+    write them to a file in the directory run_dir. Return a pair (run_file,
+    segments), as described in sort_block(). """
+    with open(input, "rb") as IN:
+        IN.seek(start)
+        block = IN.read(end - start)
+    (sorted_block, segments) = sort_block(block)
+    run_file = os.path.join(run_dir, "{}.run".format(start))
+    with open(run_file, "wb") as RUN:
+        RUN.write(sorted_block)
+    return (run_file, segments)
+
+
+def merge_runs(runs, output):
+    """ Merge the sorted runs, given as a list of pairs (run_file, segments)
+    as returned by sort_run(), and write the result to 'output'. """
+    RUNS = [open(x[0], "rb") for x in runs]
+    try:
+        with open(output, "wb") as OUT:
+            # The segments of all the runs, by decreasing support, and in the
+            # order of the runs for the same support.
+            for (neg_support, run, length) in heapq.merge(
+                    *[[(-support, run, length) for (support, length) in
+                       segments] for (run, (run_file, segments)) in
+                      enumerate(runs)]):
+                while length > 0:
+                    block = RUNS[run].read(min(BLOCK_SIZE, length))
+                    OUT.write(block)
+                    length -= len(block)
+    finally:
+        for RUN in RUNS:
+            RUN.close()
+
+
+def sort_results(input, output, processes=None, memory=MEMORY, tempdir=None):
+    """ Sort the output of the miner in the file 'input' by decreasing support
+    and write the result to 'output'.
+
+    The runs are sorted by 'processes' worker processes (by default, the
+    number of CPUs), and each run is small enough for all the runs being
+    sorted at the same time to fit in about 'memory' bytes. The sorted runs
+    are written to a temporary directory in 'tempdir' (by default, the
+    directory of 'output'), which is removed at the end. The input is read
+    completely before the output is written, so they can be the same file."""
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if tempdir is None:
+        tempdir = os.path.dirname(os.path.abspath(output))
+    try:
+        _sort_results(input, output, processes, memory, tempdir)
+    except ValueError as error:
+        utils.error_exit("{}: {}\n".format(input, error))
+
+
+def _sort_results(input, output, processes, memory, tempdir):
+    """ Do the work of sort_results(). """
+    import multiprocessing
+    size = os.path.getsize(input)
+    run_size = max(1, memory // (RUN_MEMORY_FACTOR * processes))
+    if size <= run_size:
+        with open(input, "rb") as IN:
+            block = IN.read()
+        with open(output, "wb") as OUT:
+            if len(block) > 0:
+                OUT.write(sort_block(block)[0])
+        return
+    chunks = getDatasetInfo.get_chunks(input, -(-size // run_size))
+    run_dir = tempfile.mkdtemp(prefix="sortResults", dir=tempdir)
+    try:
+        if processes == 1:
+            runs = [sort_run(input, start, end, run_dir) for (start, end) in
+                    chunks]
+        else:
+            with multiprocessing.Pool(min(processes, len(chunks))) as pool:
+                runs = pool.starmap(sort_run, [(input, start, end, run_dir)
+                                               for (start, end) in chunks])
+        merge_runs(runs, output)
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def main():
+    usage = "Usage: {} [-p processes] [-m memory_MB] [-t tempdir] input output\n".format(os.path.basename(sys.argv[0]))
+    args = sys.argv[1:]
+    processes = None
+    memory = MEMORY
+    tempdir = None
+    while len(args) > 0 and args[0] in ("-p", "-m", "-t"):
+        if len(args) < 2:
+            utils.error_exit(usage)
+        if args[0] == "-t":
+            tempdir = args[1]
+        else:
+            try:
+                value = int(args[1])
+            except ValueError:
+                utils.error_exit("{} is not a number\n".format(args[1]))
+            if value < 1:
+                utils.error_exit("{} must be positive\n".format(args[0]))
+            if args[0] == "-p":
+                processes = value
+            else:
+                memory = value << 20
+        args = args[2:]
+    if len(args) != 2:
+        utils.error_exit(usage)
+    if not os.path.isfile(args[0]):
+        utils.error_exit("{} does not exist, or is not a file\n".format(args[0]))
+
+    sort_results(args[0], args[1], processes, memory, tempdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,36 +15,187 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import os.path, random, sys
-import utils
+"""
+Partition a dataset in parts of given sizes, chosen uniformly at random.
 
+The dataset is read once, in blocks of complete lines, and only the current
+block is kept in memory. If the parts still need r_1, ..., r_k lines and a
+block has L lines, the numbers of lines of the block that go to each part
+follow the multivariate hypergeometric distribution with parameters
+(r_1, ..., r_k) and L, and the lines of the block are assigned to the parts by
+a random permutation of these labels. The resulting partition is chosen
+uniformly at random among the partitions with the given part sizes. The bytes
+of each block are written to the parts with a mask built from the line
+lengths, without parsing the lines.
 
-def main():
-    """ Partition a dataset in two equal parts. """
-    # Verify arguments
-    if len(sys.argv) != 5: 
-        utils.error_exit("Usage: {} dataset_size dataset_file expl_file eval_file\n".format(os.path.basename(sys.argv[0])))
-    dataset = sys.argv[2]
-    expl = sys.argv[3]
-    eval = sys.argv[4]
+The sizes of the parts are given by ratios (by default, equal parts). The
+parts can then be mined in parallel with minedb-gra.sh.
+"""
+
+import fractions, math, os, os.path, subprocess, sys
+import getDatasetInfo, lineindex, utils
+
+
+def parse_ratios(ratios):
+    """ Return the list of the ratios (Fractions) in the comma-separated
+    string 'ratios' (e.g., "30,70" or "0.3,0.7"). """
     try:
-       dataset_size = int(sys.argv[1])
-    except ValueError:
-        utils.error_exit("{} is not a number\n".format(sys.argv[1]))
+        values = [fractions.Fraction(x) for x in ratios.split(",")]
+    except (ValueError, ZeroDivisionError):
+        utils.error_exit("{} is not a list of ratios\n".format(ratios))
+    if len(values) < 2 or min(values) < 0 or sum(values) == 0:
+        utils.error_exit("{} is not a list of ratios\n".format(ratios))
+    return values
+
+
+def get_part_sizes(lines_num, ratios):
+    """ Return the list of the sizes of the parts of a dataset with lines_num
+    lines split according to 'ratios'.
 
-    random.seed()
-    expl_lines = frozenset(random.sample(range(dataset_size), dataset_size // 2))
+    The sizes are the floors of the shares of the lines, and the remaining
+    lines go to the parts with the largest fractional shares (to the last
+    ones, in case of ties). For two equal parts, the first part has
+    floor(lines_num / 2) lines."""
+    total = sum(fractions.Fraction(x) for x in ratios)
+    shares = [lines_num * fractions.Fraction(x) / total for x in ratios]
+    sizes = [math.floor(x) for x in shares]
+    by_remainder = sorted(range(len(ratios)), key=lambda x: (shares[x] -
+                                                             sizes[x], x),
+                          reverse=True)
+    for part in by_remainder[:lines_num - sum(sizes)]:
+        sizes[part] += 1
+    return sizes
 
-    with open(dataset, "rt") as largeFILE, open(expl, "wt") as explFILE, open(eval, "wt") as evalFILE:
-        index = 0
-        for line in largeFILE:
-            if index in expl_lines:
-                explFILE.write(line)
-            else:
-                evalFILE.write(line)
-            index += 1
+
+def count_lines(dataset):
+    """ Return the number of lines (transactions) of 'dataset', from its
+    line-offset index if there is a valid one. """
+    offsets = lineindex.load(dataset)
+    if offsets is not None:
+        return len(offsets) - 1
+    lines_num = 0
+    for block in getDatasetInfo.iter_blocks(dataset):
+        lines_num += block.count(b"\n")
+        if block[-1:] != b"\n":
+            lines_num += 1
+    return lines_num
+
+
+def split(dataset, part_files, sizes, seed=None):
+    """ Write a random partition of the lines of 'dataset' to the files in
+    part_files, such that the i-th file gets sizes[i] lines. The sum of the
+    sizes must be the number of lines of the dataset. The random numbers are
+    drawn from a numpy Generator with the given seed.
+
+    A last line without a newline gets one."""
+    import numpy as np
+    rand = np.random.default_rng(seed)
+    remaining = np.array(sizes, dtype=np.int64)
+    parts = np.arange(len(part_files), dtype=np.min_scalar_type(
+        len(part_files)))
+    FILES = [open(x, "wb") for x in part_files]
+    try:
+        for block in getDatasetInfo.iter_blocks(dataset):
+            if block[-1:] != b"\n":
+                block += b"\n"
+            buf = np.frombuffer(block, dtype=np.uint8)
+            ends = np.flatnonzero(buf == 10) + 1
+            if len(ends) > remaining.sum():
+                utils.error_exit("{} has more than {} lines\n".format(
+                    dataset, sum(sizes)))
+            counts = rand.multivariate_hypergeometric(remaining, len(ends))
+            remaining -= counts
+            labels = np.repeat(parts, counts)
+            rand.shuffle(labels)
+            byte_labels = np.repeat(labels, np.diff(ends, prepend=0))
+            for part in np.flatnonzero(counts).tolist():
+                FILES[part].write(buf[byte_labels == part].tobytes())
+    finally:
+        for FILE in FILES:
+            FILE.close()
+    if remaining.sum() > 0:
+        utils.error_exit("{} has less than {} lines\n".format(dataset,
+                                                                sum(sizes)))
+
+
+def mine_parts(part_files, sizes, min_freq, res_files, cwd=None):
+    """ Mine the parts in part_files, with sizes 'sizes', at frequency
+    min_freq, writing the results to res_files. The parts are mined in
+    parallel with minedb-gra.sh, which is run in the directory 'cwd' (it
+    reads conf.sh from there). """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "minedb-gra.sh")
+    miners = []
+    for (part_file, size, res_file) in zip(part_files, sizes, res_files):
+        supp = int(math.floor(size * min_freq))
+        miners.append(subprocess.Popen(["sh", script, str(supp), part_file,
+                                        res_file], cwd=cwd,
+                                       stdout=subprocess.DEVNULL))
+    failed = [x for (x, miner) in zip(part_files, miners) if miner.wait() !=
+              0]
+    if len(failed) > 0:
+        utils.error_exit("Mining {} failed\n".format(", ".join(failed)))
+
+
+def split_dataset(dataset_size, dataset, expl, eval, seed=None):
+    """ Partition the dataset with dataset_size transactions in two equal
+    parts, written to the files 'expl' and 'eval'. The part 'expl' gets
+    floor(dataset_size / 2) transactions. """
+    split(dataset, [expl, eval], get_part_sizes(dataset_size, [1, 1]), seed)
+
+
+def main():
+    """ Partition a dataset in parts. """
+    usage = "Usage: {0} [-r ratios] [-s seed] [-m min_freq res_file,...] dataset part_file part_file [part_file ...]\n       {0} dataset_size dataset_file expl_file eval_file\n".format(os.path.basename(sys.argv[0]))
+    args = sys.argv[1:]
+    # Legacy interface: two equal parts of a dataset of known size.
+    if len(args) == 4 and args[0].isdigit() and not os.path.isfile(args[0]):
+        split_dataset(int(args[0]), args[1], args[2], args[3])
+        return
+
+    ratios = None
+    seed = None
+    mine = None
+    while len(args) > 0 and args[0] in ("-r", "-s", "-m"):
+        if args[0] == "-m":
+            if len(args) < 3:
+                utils.error_exit(usage)
+            try:
+                mine = (float(args[1]), args[2].split(","))
+            except ValueError:
+                utils.error_exit("{} is not a number\n".format(args[1]))
+            args = args[3:]
+            continue
+        if len(args) < 2:
+            utils.error_exit(usage)
+        if args[0] == "-r":
+            ratios = parse_ratios(args[1])
+        else:
+            try:
+                seed = int(args[1])
+            except ValueError:
+                utils.error_exit("{} is not a number\n".format(args[1]))
+        args = args[2:]
+    if len(args) < 3:
+        utils.error_exit(usage)
+    dataset = args[0]
+    part_files = args[1:]
+    if not os.path.isfile(dataset):
+        utils.error_exit("{} does not exist, or is not a file\n".format(dataset))
+    if ratios is None:
+        ratios = [1] * len(part_files)
+    if len(ratios) != len(part_files):
+        utils.error_exit("There are {} ratios for {} parts\n".format(
+            len(ratios), len(part_files)))
+    if mine is not None and len(mine[1]) != len(part_files):
+        utils.error_exit("There are {} results files for {} parts\n".format(
+            len(mine[1]), len(part_files)))
+
+    sizes = get_part_sizes(count_lines(dataset), ratios)
+    split(dataset, part_files, sizes, seed)
+    if mine is not None:
+        mine_parts(part_files, sizes, mine[0], mine[1])
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,150 @@
+# Finding the True Frequent Itemsets
+#
+# Copyright 2014 Matteo Riondato <matteo@cs.brown.edu> and Fabio Vandin
+# <vandinfa@imada.sdu.dk>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Persistent cache of the dataset statistics (see getDatasetInfo.py).
+
+The stats are stored in an sqlite database, by default
+~/.cache/truefis/stats.sqlite (the directory can be changed with the
+environment variable TRUEFIS_CACHE_DIR). An entry is keyed by the absolute
+path of the dataset, and is only valid if the size and the modification time
+of the file have not changed. If the environment variable TRUEFIS_CACHE_HASH
+is set to 1, a BLAKE2b digest of the content of the dataset is also stored,
+and used to find the stats of a dataset that was modified (e.g., copied) but
+has the same content as a cached one.
+
+Each kind of value (e.g., the stats) is stored in its own table, together with
+the version of its format, i.e., of the function computing it: the table of
+the values with version v is 'name_vv' (see get_table()). When the function
+changes, its version is increased, and the values computed by the previous
+versions are ignored.
+
+The cache is shared by all the scripts, and by all their invocations.
+"""
+
+import hashlib, os, os.path, pickle, sqlite3
+
+CACHE_DIR_VAR = "TRUEFIS_CACHE_DIR"
+CACHE_HASH_VAR = "TRUEFIS_CACHE_HASH"
+CACHE_FILE = "stats.sqlite"
+HASH_BLOCK_SIZE = 1 << 24
+
+
+def get_cache_dir():
+    """ Return the directory containing the cache. """
+    return os.environ.get(CACHE_DIR_VAR, os.path.join(
+        os.path.expanduser("~"), ".cache", "truefis"))
+
+
+def use_hash():
+    """ Return True if the content digests must be used. """
+    return os.environ.get(CACHE_HASH_VAR, "0") == "1"
+
+
+def get_digest(file_name):
+    """ Return the BLAKE2b digest (hex) of the content of file_name. """
+    digest = hashlib.blake2b()
+    with open(file_name, 'rb') as FILE:
+        while True:
+            block = FILE.read(HASH_BLOCK_SIZE)
+            if len(block) == 0:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_table(name, version):
+    """ Return the table containing the values of kind 'name' with format
+    'version'. """
+    return "{}_v{}".format(name, int(version))
+
+
+def connect(table):
+    """ Return a connection to the cache database, creating the table 'table'
+    if needed, or None if the cache cannot be used.
+
+    The table has columns path, size, mtime_ns, digest, and value."""
+    try:
+        os.makedirs(get_cache_dir(), exist_ok=True)
+        connection = sqlite3.connect(os.path.join(get_cache_dir(),
+                                                  CACHE_FILE), timeout=60)
+        connection.execute(
+            " ".join(("CREATE TABLE IF NOT EXISTS {}".format(table),
+                      "(path TEXT PRIMARY KEY, size INTEGER,",
+                      "mtime_ns INTEGER, digest TEXT, value BLOB)")))
+        return connection
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def lookup(file_name, name, version):
+    """ Return the value of kind 'name' with format 'version' cached for
+    file_name, or None if there is no valid entry. """
+    table = get_table(name, version)
+    connection = connect(table)
+    if connection is None:
+        return None
+    path = os.path.abspath(file_name)
+    stat = os.stat(path)
+    try:
+        with connection:
+            row = connection.execute(
+                "SELECT size, mtime_ns, value FROM {} WHERE path = ?".format(
+                    table), (path, )).fetchone()
+            if row is not None and row[0] == stat.st_size and \
+                    row[1] == stat.st_mtime_ns:
+                return pickle.loads(row[2])
+            if not use_hash():
+                return None
+            digest = get_digest(path)
+            row = connection.execute(
+                "SELECT value FROM {} WHERE digest = ? AND size = ?".format(
+                    table), (digest, stat.st_size)).fetchone()
+            if row is None:
+                return None
+            # Cache the value for this path too.
+            connection.execute(
+                "INSERT OR REPLACE INTO {} VALUES (?, ?, ?, ?, ?)".format(
+                    table), (path, stat.st_size, stat.st_mtime_ns, digest,
+                             row[0]))
+            return pickle.loads(row[0])
+    except sqlite3.Error:
+        return None
+    finally:
+        connection.close()
+
+
+def store(file_name, value, name, version):
+    """ Store 'value', of kind 'name' with format 'version', for file_name.
+    """
+    table = get_table(name, version)
+    connection = connect(table)
+    if connection is None:
+        return
+    path = os.path.abspath(file_name)
+    stat = os.stat(path)
+    digest = get_digest(path) if use_hash() else None
+    try:
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO {} VALUES (?, ?, ?, ?, ?)".format(
+                    table), (path, stat.st_size, stat.st_mtime_ns, digest,
+                             pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+    except sqlite3.Error:
+        pass
+    finally:
+        connection.close()
@@ -0,0 +1,309 @@
+# Finding the True Frequent Itemsets
+#
+# Copyright 2014 Matteo Riondato <matteo@cs.brown.edu> and Fabio Vandin
+# <vandinfa@imada.sdu.dk>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Set-Union Knapsack Problem (SUKP) used to bound the VC-dimension.
+
+Given a collection of sets (itemsets) over a ground set of items, and a
+capacity c, we want the maximum number of sets whose union has at most c items
+and that contains at most one set from each chain. The integer program has a
+binary variable for each set (the first 'sets_num' variables) and one for each
+item, and the constraints
+    item - set >= 0, for each set and each item in the set,
+    sum of the items <= capacity,
+    sum of the sets in a chain <= 1, for each chain.
+
+The model is built from arrays of indexes once, and can be solved for
+different capacities (see Model.solve_capacity()). Since the optimal value can
+only grow with the capacity, the previous solves give an upper bound to the
+optimal value (added to the problem as a constraint on the objective) and
+feasible starting solutions. The model is solved in-process by one of the
+available backends:
+    'highs': HiGHS through scipy.optimize.milp (the default, no license needed)
+    'cplex': the CPLEX Python API, if installed
+The backend can be chosen with the environment variable SUKP_SOLVER.
+"""
+
+import collections, math, os, sys
+import numpy as np
+import utils
+
+DEFAULT_SOLVER = "highs"
+TIME_LIMIT = 600
+
+# The result of a solve: the solver status code and its description, the best
+# known upper bound to the optimal value, the relative gap between the best
+# solution found and the bound, and the value of the best solution found.
+Solution = collections.namedtuple(
+    "Solution", ["status", "status_string", "best_bound", "gap", "objective"])
+
+
+class Model:
+    """ An instance of the Set-Union Knapsack Problem.
+
+    The pair i is the constraint that the item pair_items[i] must be selected
+    if the set pair_sets[i] is selected. 'chains' is an iterable of lists of
+    set indexes. If 'maximal_chains' is True, the chains are all the maximal
+    chains of the collection ordered by inclusion (from the smallest set), so
+    the selected sets must be an antichain."""
+
+    def __init__(self, sets_num, items_num, pair_sets, pair_items, chains,
+                 capacity, maximal_chains=False):
+        self.sets_num = sets_num
+        self.items_num = items_num
+        self.pair_sets = np.asarray(pair_sets, dtype=np.int64)
+        self.pair_items = np.asarray(pair_items, dtype=np.int64)
+        chain_offsets = [0, ]
+        chain_sets = []
+        for chain in chains:
+            chain_sets.extend(chain)
+            chain_offsets.append(len(chain_sets))
+        self.chain_offsets = np.array(chain_offsets, dtype=np.int64)
+        self.chain_sets = np.array(chain_sets, dtype=np.int64)
+        self.capacity = capacity
+        self.maximal_chains = maximal_chains
+        # Upper bound to the optimal value, if known, and the indexes of the
+        # sets of a feasible solution, used as a starting point.
+        self.upper_bound = None
+        self.start = None
+        # The (capacity, solution, selected sets) of the previous solves.
+        self.history = []
+        self._cplex = None
+
+    @property
+    def vars_num(self):
+        return self.sets_num + self.items_num
+
+    @property
+    def pairs_num(self):
+        return len(self.pair_sets)
+
+    @property
+    def chains_num(self):
+        return len(self.chain_offsets) - 1
+
+    def get_constraints(self):
+        """ Return the constraint matrix as a triple (rows, cols, vals) of
+        arrays, in the order: pair constraints, capacity, chains. """
+        pairs_num = self.pairs_num
+        pair_rows = np.arange(pairs_num, dtype=np.int64)
+        capacity_row = pairs_num
+        chain_rows = capacity_row + 1 + np.repeat(
+            np.arange(self.chains_num, dtype=np.int64),
+            np.diff(self.chain_offsets))
+        rows = np.concatenate(
+            (pair_rows, pair_rows,
+             np.full(self.items_num, capacity_row, dtype=np.int64),
+             chain_rows))
+        cols = np.concatenate(
+            (self.pair_sets, self.sets_num + self.pair_items,
+             self.sets_num + np.arange(self.items_num, dtype=np.int64),
+             self.chain_sets))
+        vals = np.concatenate(
+            (np.full(pairs_num, -1.0), np.ones(pairs_num),
+             np.ones(self.items_num), np.ones(len(self.chain_sets))))
+        return (rows, cols, vals)
+
+    def get_union_size(self, sets):
+        """ Return the number of items in the union of the sets with the given
+        indexes. """
+        return len(np.unique(self.pair_items[np.isin(self.pair_sets, sets)]))
+
+    def solve(self, gap=0.0, solver=None):
+        """ Solve the problem to relative gap 'gap' with the given solver
+        backend (see the module documentation) and return a Solution. """
+        if solver is None:
+            solver = os.environ.get("SUKP_SOLVER", DEFAULT_SOLVER)
+        if solver not in SOLVERS:
+            utils.error_exit("Unknown SUKP solver '{}'. Choose from {}\n".format(
+                solver, ", ".join(sorted(SOLVERS))))
+        (solution, sets) = SOLVERS[solver](self, gap)
+        self.history.append((self.capacity, solution, sets))
+        return solution
+
+    def solve_capacity(self, capacity, gap=0.0, solver=None,
+                       upper_bound=None, start=None):
+        """ Solve the problem with the given capacity, using the previous
+        solves for a warm start, and return a Solution.
+
+        A solve with a larger capacity gives an upper bound to the optimal
+        value, and a solution for a lower capacity (or any solution using at
+        most 'capacity' items) is feasible. An additional upper bound, and the
+        indexes of the sets of a feasible solution, can be passed as
+        'upper_bound' and 'start' (see bounds.py). If the best feasible
+        solution matches the upper bound, the problem is not solved again."""
+        self.capacity = capacity
+        self.upper_bound = upper_bound
+        self.start = start
+        start_objective = -1 if start is None else len(start)
+        for (prev_capacity, prev_solution, prev_sets) in self.history:
+            if prev_capacity >= capacity:
+                prev_bound = math.floor(prev_solution.best_bound + 1e-6)
+                if self.upper_bound is None or prev_bound < self.upper_bound:
+                    self.upper_bound = prev_bound
+            if prev_sets is not None and \
+                    prev_solution.objective > start_objective and \
+                    (prev_capacity <= capacity or
+                     self.get_union_size(prev_sets) <= capacity):
+                self.start = prev_sets
+                start_objective = prev_solution.objective
+        if self.upper_bound is not None and \
+                start_objective >= self.upper_bound:
+            return Solution(None, "Optimal value known without solving",
+                            self.upper_bound, 0.0, self.upper_bound)
+        return self.solve(gap, solver)
+
+
+def _get_gap(objective, best_bound):
+    """ Return the relative gap between the objective and the bound. """
+    if objective > 0:
+        return max(0.0, (best_bound - objective) / objective)
+    return 0.0 if best_bound <= objective else math.inf
+
+
+def solve_highs(model, gap):
+    """ Solve the model with HiGHS through scipy.optimize.milp.
+
+    scipy.optimize.milp does not keep the solver state between calls and does
+    not accept starting solutions, so only the upper bound to the optimal
+    value is used for the warm start. Return a pair (solution, sets)."""
+    import scipy.optimize, scipy.sparse
+    (rows, cols, vals) = model.get_constraints()
+    rows_num = model.pairs_num + 1 + model.chains_num
+    lower = [np.zeros(model.pairs_num), [-np.inf],
+             np.full(model.chains_num, -np.inf)]
+    upper = [np.full(model.pairs_num, np.inf), [model.capacity],
+             np.ones(model.chains_num)]
+    if model.upper_bound is not None:
+        # Objective constraint: the sum of the sets is at most the bound.
+        rows = np.concatenate((rows, np.full(model.sets_num, rows_num)))
+        cols = np.concatenate((cols, np.arange(model.sets_num)))
+        vals = np.concatenate((vals, np.ones(model.sets_num)))
+        rows_num += 1
+        lower.append([-np.inf])
+        upper.append([model.upper_bound])
+    matrix = scipy.sparse.csr_matrix((vals, (rows, cols)),
+                                     shape=(rows_num, model.vars_num))
+    objective = np.concatenate((np.full(model.sets_num, -1.0),
+                                np.zeros(model.items_num)))
+    result = scipy.optimize.milp(
+        objective, integrality=np.ones(model.vars_num),
+        bounds=scipy.optimize.Bounds(0, 1),
+        constraints=scipy.optimize.LinearConstraint(
+            matrix, np.concatenate(lower), np.concatenate(upper)),
+        options={"mip_rel_gap": gap, "time_limit": TIME_LIMIT})
+    if result.x is None:
+        utils.error_exit("HiGHS did not find a solution: {} {}\n".format(
+            result.status, result.message))
+    best_objective = int(round(-result.fun))
+    # The objective is integer, so the bound can be rounded down.
+    best_bound = math.floor(-result.mip_dual_bound + 1e-6)
+    sets = np.flatnonzero(result.x[:model.sets_num] > 0.5)
+    return (Solution(result.status, result.message, best_bound,
+                     _get_gap(best_objective, best_bound), best_objective),
+            sets)
+
+
+def _create_cplex(model):
+    """ Create the CPLEX problem for the model. The capacity and the objective
+    constraint are the last two rows, and are updated before each solve. """
+    import cplex
+    (rows, cols, vals) = model.get_constraints()
+    order = np.argsort(rows, kind="stable")
+    row_offsets = np.searchsorted(rows[order], np.arange(
+        model.pairs_num + 2 + model.chains_num))
+    cols = cols[order].tolist()
+    vals = vals[order].tolist()
+    lin_expr = [cplex.SparsePair(ind=cols[row_offsets[i]:row_offsets[i + 1]],
+                                 val=vals[row_offsets[i]:row_offsets[i + 1]])
+                for i in range(len(row_offsets) - 1)]
+    prob = cplex.Cplex()
+    prob.set_error_stream(sys.stderr)
+    prob.set_log_stream(sys.stderr)
+    prob.set_results_stream(sys.stderr)
+    prob.set_warning_stream(sys.stderr)
+    prob.parameters.timelimit.set(TIME_LIMIT)
+    prob.objective.set_sense(prob.objective.sense.maximize)
+    prob.variables.add(
+        obj=[1.0] * model.sets_num + [0.0] * model.items_num,
+        ub=[1.0] * model.vars_num, types="I" * model.vars_num)
+    prob.linear_constraints.add(
+        lin_expr=lin_expr,
+        senses="G" * model.pairs_num + "L" + "L" * model.chains_num,
+        rhs=[0.0] * model.pairs_num + [model.capacity] +
+        [1.0] * model.chains_num)
+    prob.linear_constraints.add(
+        lin_expr=[cplex.SparsePair(ind=list(range(model.sets_num)),
+                                   val=[1.0] * model.sets_num)],
+        senses="L", rhs=[float(model.sets_num)])
+    prob.MIP_starts.add(
+        cplex.SparsePair(ind=list(range(model.vars_num)),
+                         val=[1.0] * model.vars_num),
+        prob.MIP_starts.effort_level.auto)
+    return prob
+
+
+def solve_cplex(model, gap):
+    """ Solve the model with the CPLEX Python API.
+
+    The CPLEX problem is kept in the model between solves: only the capacity
+    and the objective constraint are updated, and the starting solution is
+    passed as a MIP start. Return a pair (solution, sets)."""
+    if "ILOG_LICENSE_FILE" not in os.environ:
+        os.environ["ILOG_LICENSE_FILE"] = \
+            "/local/projects/cplex/ilm/site.access.ilm"
+    try:
+        import cplex
+        from cplex.exceptions import CplexError
+    except ImportError:
+        utils.error_exit("The CPLEX Python API is not available\n")
+    try:
+        if model._cplex is None:
+            model._cplex = _create_cplex(model)
+        prob = model._cplex
+        capacity_row = model.pairs_num
+        objective_row = model.pairs_num + 1 + model.chains_num
+        prob.linear_constraints.set_rhs(
+            [(capacity_row, float(model.capacity)),
+             (objective_row, float(model.sets_num if model.upper_bound is None
+                                   else model.upper_bound))])
+        if model.start is not None:
+            prob.MIP_starts.delete()
+            start_sets = [int(x) for x in model.start]
+            start_items = np.unique(model.pair_items[np.isin(
+                model.pair_sets, model.start)])
+            prob.MIP_starts.add(
+                cplex.SparsePair(
+                    ind=start_sets + [model.sets_num + int(x) for x in
+                                      start_items],
+                    val=[1.0] * (len(start_sets) + len(start_items))),
+                prob.MIP_starts.effort_level.auto)
+        prob.parameters.mip.tolerances.mipgap.set(gap)
+        prob.solve()
+        status = prob.solution.get_status()
+        values = prob.solution.get_values(0, model.sets_num - 1)
+        sets = np.flatnonzero(np.array(values) > 0.5)
+        return (Solution(status, prob.solution.status[status],
+                         prob.solution.MIP.get_best_objective(),
+                         prob.solution.MIP.get_mip_relative_gap(),
+                         int(round(prob.solution.get_objective_value()))),
+                sets)
+    except CplexError as exc:
+        utils.error_exit("CPLEX error: {}\n".format(exc))
+
+
+SOLVERS = {"highs": solve_highs, "cplex": solve_cplex}
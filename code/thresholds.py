@@ -0,0 +1,81 @@
+# Finding the True Frequent Itemsets
+#
+# Copyright 2014 Matteo Riondato <matteo@cs.brown.edu> and Fabio Vandin
+# <vandinfa@imada.sdu.dk>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Critical supports of the Binomial tests.
+
+An itemset with support s in a dataset with 'size' transactions is accepted
+by the Binomial test if its p-value (see utils.pvalues()) is at most the
+critical value. For supports larger than supposed_freq * size, the p-value
+decreases as the support grows, for all the methods, so the accepted itemsets
+are exactly those with support at least a minimum accepted support. All the
+itemsets in the results have such supports, as min_freq > supposed_freq.
+
+The minimum accepted support is found by a binary search over the integer
+supports, and is memoized for each tuple of parameters, so that filtering a
+results file (sorted by support) is a binary search on its supports. The
+epsilon of a Binomial test is the difference between the minimum accepted
+frequency (the minimum accepted support divided by the size) and the minimum
+frequency, so it is exact and comes from the same search.
+"""
+
+import functools, math
+import utils
+
+
+@functools.lru_cache(maxsize=None)
+def get_min_accepted_support(mode, size, supposed_freq, critical_value):
+    """ Return the minimum support larger than supposed_freq * size that is
+    accepted by the Binomial test with the given mode and critical value, in
+    a dataset with 'size' transactions, or size + 1 if no support is
+    accepted. """
+    # The supports not larger than supposed_freq * size are never accepted.
+    non_accepted = int(math.floor(supposed_freq * size))
+    accepted = size + 1
+    while accepted - non_accepted > 1:
+        mid = (accepted + non_accepted) // 2
+        if utils.pvalues(mode, [mid], size, supposed_freq)[0] <= \
+                critical_value:
+            accepted = mid
+        else:
+            non_accepted = mid
+    return accepted
+
+
+def count_accepted(supports, min_supp):
+    """ Return the number of supports at least min_supp in 'supports' (a
+    numpy array or a list), sorted in decreasing order. """
+    import numpy as np
+    supports = np.asarray(supports, dtype=np.int64)
+    return len(supports) - int(np.searchsorted(supports[::-1], min_supp,
+                                               side='left'))
+
+
+def get_epsilon(mode, size, supposed_freq, critical_value, min_freq,
+                lowest_freq=None):
+    """ Return the epsilon of the Binomial test with the given parameters,
+    i.e., the difference between the minimum accepted frequency and
+    min_freq.
+
+    The minimum accepted frequency is the minimum accepted support divided by
+    'size', at most 1.0 (if no support is accepted) and at least lowest_freq
+    (by default, min_freq)."""
+    if lowest_freq is None:
+        lowest_freq = min_freq
+    min_accepted_freq = min(1.0, get_min_accepted_support(
+        mode, size, supposed_freq, critical_value) / size)
+    return max(lowest_freq, min_accepted_freq) - min_freq
@@ -15,9 +15,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import math, sys
-from scipy.stats import binom as scipy_binom
-from scipy.misc import logsumexp as scipy_logsumexp
+import sys
+import numerics
 
 
 def error_exit(msg):
@@ -33,24 +32,38 @@ def get_closed_itemsets(itemsets):
     whose keys are itemsets (frozensets) and whose values are the frequencies.
     Return a similar dict.
 
+    An itemset is closed if none of its supersets in 'itemsets' has the same
+    frequency. Only itemsets with the same frequency can absorb one another,
+    so we bucket the itemsets by frequency and, for each itemset, only look
+    for its immediate subsets in its own bucket. This is correct as long as
+    'itemsets' contains all the itemsets between an itemset and any of its
+    supersets with the same frequency, which is the case for the results of a
+    mining run and for any band of them defined by frequency thresholds.
+
     """
+    buckets = dict()
+    for itemset in itemsets:
+        freq = itemsets[itemset]
+        if freq in buckets:
+            buckets[freq].add(itemset)
+        else:
+            buckets[freq] = set([itemset, ])
+
+    not_closed = set()
+    for bucket in buckets.values():
+        if len(bucket) == 1:
+            continue
+        for itemset in bucket:
+            for item in itemset:
+                subset = itemset - frozenset([item, ])
+                if subset in bucket:
+                    not_closed.add(subset)
+
     closed_itemsets = dict()
-    border = set()
-    itemsets_sorted_by_size = sorted(itemsets, key=len)
-    for itemset in itemsets_sorted_by_size:
-        to_remove = set()
-        to_remove_border = set()
-        for closed in border:
-            if itemset > closed:
-                if itemsets[closed] == itemsets[itemset]:
-                    to_remove.add(closed)
-                to_remove_border.add(closed)
-        border -= to_remove_border
-        border.add(itemset)
-        for key in to_remove:
-            del closed_itemsets[key]
-        closed_itemsets[itemset] = itemsets[itemset]
-        
+    for itemset in sorted(itemsets, key=len):
+        if itemset not in not_closed:
+            closed_itemsets[itemset] = itemsets[itemset]
+
     #check_closed_itemsets(closed_itemsets)
     return closed_itemsets
 
@@ -70,48 +83,83 @@ def get_maximal_itemsets(itemsets):
     whose keys are itemsets (frozensets) and whose values are the frequencies.
     Return a similar dict.
 
+    The itemsets are processed by decreasing length. For each item we keep a
+    bitmap (an int) of the maximal itemsets found so far that contain it, so
+    an itemset is contained in a known maximal itemset if and only if the AND
+    of the bitmaps of its items is not zero.
+
     """
     maximal_itemsets = dict()
-    maximal_itemsets_list = []
+    item_bitmaps = dict()
+    all_bitmap = 0
     itemsets_revsorted_by_size = sorted(itemsets.keys(), key=len, reverse=True)
     for itemset in itemsets_revsorted_by_size:
-        to_add = True
-        for maximal in maximal_itemsets_list:
-            if itemset < maximal:
-                to_add = False
+        bitmap = all_bitmap
+        for item in itemset:
+            if not bitmap:
                 break
-        if to_add:
+            bitmap &= item_bitmaps.get(item, 0)
+        if not bitmap:
             maximal_itemsets[itemset] = itemsets[itemset]
-            maximal_itemsets_list.append(itemset)
+            bit = 1 << len(maximal_itemsets)
+            all_bitmap |= bit
+            for item in itemset:
+                item_bitmaps[item] = item_bitmaps.get(item, 0) | bit
     return maximal_itemsets
 
 
-def create_results(file_name, min_freq):
-    """Read Frequent Itemsets at threshold min_freq from filename.
-    
-    Return a dict where the keys are frequent itemsets (represented as
-    frozensets) and the values are their frequencies. Only itemsets with
-    frequency at least min_freq are returned.
+def parse_size_line(size_line):
+    """ Return the size of the dataset from the first line of a results file.
+
+    The line has the form (SIZE) where SIZE is the number of transactions in
+    the dataset from which the itemsets where extracted."""
+    try:
+        size_str = size_line.split("(")[1].split(")")[0]
+    except IndexError:
+        error_exit("Cannot compute size of the original dataset: '{}' is not in the recognized format\n".format(size_line))
+    try:
+        size = int(size_str)
+    except ValueError:
+        error_exit("Cannot compute size of the original dataset: '{}' is not a number\n".format(size_str))
+    return size
+
+
+def get_results_size(file_name):
+    """ Return the size of the dataset from which the itemsets in the results
+    file file_name were extracted. """
+    import results as binary_results
+    index = binary_results.get_loaded(file_name)
+    if index is not None:
+        return index.size
+    with open(file_name) as FILE:
+        return parse_size_line(FILE.readline())
 
-    The first line of the results file file_name has the form (SIZE) where SIZE
-    is the number of transactions in the dataset from which the itemsets where
-    extracted. The following lines have the format N1 N2 N3 N4 (SUPPORT) where
-    NX is an item (integer) and SUPPORT is the support of the itemset. The
-    itemsets are expected to appear in the file in reverse sorted order by
-    support (from most frequent to least frequent).
 
-    """
-    results = dict()
+def get_max_freq(file_name):
+    """ Return the maximum frequency of an itemset in the results file
+    file_name, i.e., the frequency of the first itemset in the file. """
+    for (itemset, freq) in iter_results(file_name, 0.0):
+        return freq
+    error_exit("Cannot compute the maximum frequency: '{}' contains no itemsets\n".format(file_name))
+
+
+def iter_results(file_name, min_freq):
+    """ Iterate over the Frequent Itemsets at threshold min_freq in file_name.
+
+    Yield pairs (itemset, frequency), where the itemset is a frozenset, in the
+    order in which they appear in the file, i.e., from most frequent to least
+    frequent. Stop at the first itemset with frequency lower than min_freq,
+    without reading the rest of the file. See create_results() for the format
+    of the file. If the file was loaded with results.load(), the loaded index
+    is used instead."""
+    import results as binary_results
+    index = binary_results.get_loaded(file_name)
+    if index is not None:
+        yield from index.iter_itemsets(min_freq)
+        return
+
     with open(file_name) as FILE:
-        size_line = FILE.readline()
-        try:
-            size_str = size_line.split("(")[1].split(")")[0]
-        except IndexError:
-            error_exit("Cannot compute size of the original dataset: '{}' is not in the recognized format\n".format(size_line))
-        try:
-            size = int(size_str)
-        except ValueError:
-            error_exit("Cannot compute size of the original dataset: '{}' is not a number\n".format(size_line.split("(")[1].split(")")[0]))
+        size = parse_size_line(FILE.readline())
         prev_freq = 1.0
         for line in FILE:
             if line.find("(") > -1:
@@ -122,97 +170,147 @@ def create_results(file_name, min_freq):
                 if freq > prev_freq:
                     error_exit("Results file must be sorted\n")
                 if freq >= min_freq:
-                    results[itemset] = freq
+                    yield (itemset, freq)
                     prev_freq = freq
                 else:
                     break
-    return results
 
 
-def print_itemset(itemset, frequency, ds_size=1):
-    """ Print an itemset and its support (frequency * ds_size).
-    
-    Uses the 'standard' FIMI format: 'item1 item2 item3 (support)'"""
-    print("{} ({})".format(" ".join(str(item) for item in itemset),
-        int(frequency * ds_size)))
+def count_results(file_name, min_freq):
+    """ Return the number of itemsets with frequency at least min_freq in the
+    results file file_name.
 
+    Only the supports are parsed, the itemsets are not created."""
+    import results as binary_results
+    index = binary_results.get_loaded(file_name)
+    if index is not None:
+        return index.count(min_freq)
 
-def print_itemsets(itemsets, ds_size=1):
-    """ Print a collection of itemsets with their support. 
+    count = 0
+    with open(file_name) as FILE:
+        size = parse_size_line(FILE.readline())
+        for line in FILE:
+            open_index = line.find("(")
+            if open_index > -1:
+                if int(line[open_index + 1:-2]) / size >= min_freq:
+                    count += 1
+                else:
+                    break
+    return count
 
-    The first line to be printed is the size of the dataset in parentheses,
-    then come the itemsets, in reverse sorted order by support, printed in the
-    'standard' FIMI format: 'item1 item2 item3 (support)'."""
 
-    print(" ({})".format(ds_size)) # The space at the beginning makes sense.
+def get_results_supports(file_name, min_freq):
+    """ Return the supports (a numpy array) of the itemsets with frequency at
+    least min_freq in the results file file_name, in the order in which they
+    appear in the file.
 
-    for itemset in sorted(itemsets, key=lambda x: itemsets[x], reverse=True):
-        print_itemset(itemset, itemsets[itemset], ds_size)
+    Only the supports are parsed, the itemsets are not created."""
+    import numpy as np
+    import results as binary_results
+    index = binary_results.get_loaded(file_name)
+    if index is not None:
+        return np.asarray(index.supports[:index.count(min_freq)],
+                          dtype=np.int64)
 
-def log_factorial(m,n):
-    """ Compute the logarithm of m * (m+1) * ... * n """
-    sum = 0
-    for i in range(m,n+1): sum += math.log(i)
-    return sum
+    supports = []
+    with open(file_name) as FILE:
+        size = parse_size_line(FILE.readline())
+        for line in FILE:
+            open_index = line.find("(")
+            if open_index > -1:
+                support = int(line[open_index + 1:-2])
+                if support / size >= min_freq:
+                    supports.append(support)
+                else:
+                    break
+    return np.array(supports, dtype=np.int64)
 
 
-def log_binomial(n,k): 
-    """ Compute the logarithm of n choose k """
-    if k > (n-k):
-        return (log_factorial(n-k+1,n)-log_factorial(2,k))
-    else:
-        return (log_factorial(k+1,n)-log_factorial(2,n-k))
+def create_results(file_name, min_freq):
+    """Read Frequent Itemsets at threshold min_freq from filename.
+    
+    Return a dict where the keys are frequent itemsets (represented as
+    frozensets) and the values are their frequencies. Only itemsets with
+    frequency at least min_freq are returned.
 
+    The first line of the results file file_name has the form (SIZE) where SIZE
+    is the number of transactions in the dataset from which the itemsets where
+    extracted. The following lines have the format N1 N2 N3 N4 (SUPPORT) where
+    NX is an item (integer) and SUPPORT is the support of the itemset. The
+    itemsets are expected to appear in the file in reverse sorted order by
+    support (from most frequent to least frequent).
 
-def get_union_bound_factor(n, d):
-    """ Compute the natural logarithm of the number of itemsets """
-    binoms = []
-    for i in range(1,d+1):
-        binoms.append(log_binomial(n, i))
-    return scipy_logsumexp(binoms)
+    The file can also be a binary results file (see results.py), in which case
+    no parsing is needed and the itemsets with frequency at least min_freq are
+    found by binary search on the supports. The same holds for a text file
+    already loaded with results.load().
 
+    Use iter_results() to avoid keeping all the itemsets in memory.
 
-def pvalue_exact(freq, size, supposed_freq):
-    """ Compute p-value using the exact binomial distribution. 
-    
-    We work in the log space, so this is the logarithm of the real p-value.
     """
-    return scipy_binom.logsf(int(freq * size) - 1, size, supposed_freq)
-
+    return dict(iter_results(file_name, min_freq))
 
-def pvalue_chernoff(freq, size, supposed_freq):
-    """ Compute p-value using Chernoff bounds.
 
-    We work in the log space, so this is the logarithm of the real p-value.
+def print_itemset(itemset, frequency, ds_size=1, file=None):
+    """ Print an itemset and its support (frequency * ds_size) to 'file' (by
+    default, the standard output).
     
-    We use Equation 4.1 from Thm. 4.4 in Mitzenmacher and Upfal, 'Probability
-    and Computing", Cambridge University Press, 2005.
-    """
-    return size * (freq - supposed_freq - (freq * math.log(freq / supposed_freq)))
+    Uses the 'standard' FIMI format: 'item1 item2 item3 (support)'"""
+    print("{} ({})".format(" ".join(str(item) for item in itemset),
+        int(frequency * ds_size)), file=file)
 
 
-def pvalue_weak(freq, size, supposed_freq):
-    """ Compute p-value using Chernoff bounds.
+def print_itemsets(itemsets, ds_size=1, file=None):
+    """ Print a collection of itemsets with their support to 'file' (by
+    default, the standard output).
 
-    We work in the log space, so this is the logarithm of the real p-value.
-    
-    We use Equation 4.2 from Thm. 4.4 in Mitzenmacher and Upfal, 'Probability
-    and Computing", Cambridge University Press, 2005.
-    """
-    return -size * math.pow(freq - supposed_freq, 2.0) / (supposed_freq * 3)
+    The first line to be printed is the size of the dataset in parentheses,
+    then come the itemsets, in reverse sorted order by support, printed in the
+    'standard' FIMI format: 'item1 item2 item3 (support)'."""
 
+    # The space at the beginning makes sense.
+    print(" ({})".format(ds_size), file=file)
 
-def pvalue(mode, freq, size, supposed_freq):
-    """ Compute the p-value using the selected method.
-    
-    We work in the log space, so this is the logarithm of the real p-value.
-    """
+    for itemset in sorted(itemsets, key=lambda x: itemsets[x], reverse=True):
+        print_itemset(itemset, itemsets[itemset], ds_size, file)
+
+def log_factorial(m,n):
+    """ Compute the logarithm of m * (m+1) * ... * n (see numerics.py) """
+    return numerics.log_factorial(m, n)
+
+
+def log_binomial(n,k): 
+    """ Compute the logarithm of n choose k (see numerics.py) """
+    return numerics.log_binomial(n, k)
+
+
+def get_union_bound_factor(n, d):
+    """ Compute the natural logarithm of the number of itemsets (see
+    numerics.py) """
+    return numerics.get_union_bound_factor(n, d)
+
+
+def pvalues(mode, supports, size, supposed_freq):
+    """ Compute the p-values of itemsets with the given supports (a numpy
+    array or a list) in a dataset with 'size' transactions, using the
+    selected method, in one vectorized call.
+
+    We work in the log space, so these are the logarithms of the real
+    p-values. The mode "E" uses the exact binomial distribution. The modes "C"
+    and "W" use the Chernoff bounds of Equations 4.1 and 4.2 from Thm. 4.4 in
+    Mitzenmacher and Upfal, 'Probability and Computing", Cambridge University
+    Press, 2005, for the frequency support / size."""
+    import numpy as np
+    supports = np.asarray(supports, dtype=np.float64)
     if mode == "E":
-        return pvalue_exact(freq, size, supposed_freq)
-    elif mode == "C":
-        return pvalue_chernoff(freq, size, supposed_freq)
+        from scipy.stats import binom as scipy_binom
+        return scipy_binom.logsf(supports - 1, size, supposed_freq)
+    freqs = supports / size
+    if mode == "C":
+        return size * (freqs - supposed_freq - (freqs * np.log(freqs /
+                                                               supposed_freq)))
     elif mode == "W":
-        return pvalue_weak(freq, size, supposed_freq)
+        return -size * np.power(freqs - supposed_freq, 2.0) / \
+            (supposed_freq * 3)
     else: # NOT REACHED
         assert False
-